@@ -1,9 +1,21 @@
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import json
-from src.extractors import extract_text_in_order
-from src.parsers import extract_patient_parse, demographics_parse,discharge_condition_parse,medication_parse
+import asyncio
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from src.cache import CACHE_DIR, ROOT_DIR, ReportCache, pdf_digest
+from src.jobs import JobQueue, iter_sse
+from src.labs import LabTrendIndex
+from src.pipeline import LazyReport, load_cached_report, parse_report
+from src.report_store import ReportStore
+from src.responses import EncodedBody, ResponseCache
+from utils import metrics
+from utils.memory import MemoryLimits
 
 
 app = FastAPI(title="Patient Report API")
@@ -19,49 +31,193 @@ app.add_middleware(
 FRONTEND_PATH = r"D:\Nikhil\python\report_analysis\index.html"
 PDF_PATH = r"D:\Nikhil\python\report_analysis\data\raw\KIMS _ EHR (19).pdf"
 
+REPORT_CACHE = ReportCache()
+ADMISSION_CACHE = ReportCache(os.path.join(CACHE_DIR, "admissions"))
+REPORT_STORE = ReportStore(max_bytes=256 * 1024 * 1024, loader=lambda report_id: load_cached_report(report_id, REPORT_CACHE))
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", os.cpu_count() or 1))
+# Started by startup_event (and replaced by restart_pool), so importing app starts no processes
+REPORT_POOL = None
+REPORT_POOL_LOCK = threading.Lock()
+# Low-memory mode for the upload and job workers; set REPORT_LOW_MEMORY=1 (see MemoryLimits.from_env)
+MEMORY_LIMITS = MemoryLimits.from_env()
+REPORT_ID = re.compile(r"^[0-9a-f]{64}$")
+LAB_INDEX_PATH = os.path.join(ROOT_DIR, "data", "lab_index.npz")
+LAB_INDEX = LabTrendIndex.load(LAB_INDEX_PATH)
+LAB_INDEX_LOCK = threading.Lock()
+# Uploads within this many seconds of each other share one rewrite of LAB_INDEX_PATH
+LAB_SAVE_DELAY = 5.0
+LAB_SAVE_TIMER = None
+LAB_SAVE_LOCK = threading.Lock()
+# Encoded section bodies: ("startup", section) for REPORT, (report_id, section) for uploads
+RESPONSES = ResponseCache(max_bytes=64 * 1024 * 1024)
 
+# URL section name -> key returned by parse_report
+REPORT_SECTIONS = {
+    "patients": "patient",
+    "diagnosis": "diagnosis",
+    "discharge": "discharge",
+    "medication": "medication",
+}
 
-patient_json = None
-diagnosis_json = None
-discharge_json = None
-medication_json = None
 
 
+# Background-extracted report for PDF_PATH; see load_pdf_and_extract
+REPORT = None
+SECTION_TIMEOUT = 120
+# Whether REPORT's labs are in LAB_INDEX yet; see index_startup_labs
+STARTUP_LABS_INDEXED = False
+STARTUP_LABS_LOCK = threading.Lock()
+
+# FRONTEND_PATH's encoded body and the mtime it was read at
+HTML_SHELL = (None, None)
+
+
+def cached_response(request: Request, encoded: EncodedBody):
+    """The pre-encoded body (gzip if accepted), or 304 if the client already holds it."""
+    body, etag, encoding = encoded.variant(request.headers.get("accept-encoding"))
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if encoded.not_modified(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=encoded.media_type, headers=headers)
+
+
+def startup_section(name: str):
+    """One section of REPORT, encoded once when it is first served after parsing; None if missing."""
+    encoded = RESPONSES.get(("startup", name))
+    if encoded is None:
+        content = REPORT.section(name, timeout=SECTION_TIMEOUT)
+        if not content:
+            return None
+        encoded = RESPONSES.put(("startup", name), EncodedBody.json(content))
+    return encoded
+
+
+def section_response(request: Request, name: str, missing: str):
+    encoded = startup_section(name)
+    if encoded is None:
+        return JSONResponse(content={"error": missing}, status_code=404)
+    return cached_response(request, encoded)
+
+
+def parse_fields(fields: str | None):
+    """URL section names picked by ?fields=a,b (all if omitted), in REPORT_SECTIONS order."""
+    wanted = {field.strip() for field in (fields or "").split(",") if field.strip()}
+    if not wanted:
+        return list(REPORT_SECTIONS)
+    unknown = wanted.difference(REPORT_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [field for field in REPORT_SECTIONS if field in wanted]
+
+
+def report_response(request: Request, owner: str, parts: dict):
+    """{field: section} in one body, spliced from the already-encoded sections.
+
+    The combined body is cached under its parts' ETags, so it changes exactly
+    when one of them does and a stale combination simply ages out of the LRU.
+    """
+    key = (owner, "report", tuple((field, part.etag if part else None) for field, part in parts.items()))
+    encoded = RESPONSES.get(key)
+    if encoded is None:
+        members = b",".join(b'"%s":%s' % (field.encode(), part.body if part else b"null") for field, part in parts.items())
+        encoded = RESPONSES.put(key, EncodedBody(b"{" + members + b"}"))
+    return cached_response(request, encoded)
+
+
+
+def index_labs(report: dict):
+    """Add a parsed report's labs to LAB_INDEX and schedule saving it."""
+    global LAB_SAVE_TIMER
+    if not LAB_INDEX.add(report.get("patient"), report.get("test_data")):
+        return
+    with LAB_INDEX_LOCK:
+        if LAB_SAVE_TIMER is None:
+            LAB_SAVE_TIMER = threading.Timer(LAB_SAVE_DELAY, save_lab_index)
+            LAB_SAVE_TIMER.daemon = True
+            LAB_SAVE_TIMER.start()
 
-def load_pdf_and_extract():
-    """Extract text and structured JSONs from the given PDF."""
-    global patient_json, diagnosis_json, discharge_json, medication_json
 
-    # Extract sections
-    all_text, patient_demographics, discharge_text, medication_text, test_data, follow_up = extract_text_in_order(PDF_PATH)
+def save_lab_index():
+    """Write LAB_INDEX to disk if a save is pending, or wait for one in progress.
 
-    # Parse individual sections
-    patient = extract_patient_parse(patient_demographics)
-    diagnosis = demographics_parse(patient_demographics)
-    discharge = discharge_condition_parse(discharge_text)
-    medication =medication_parse(medication_text)
+    A change made while it is written schedules another save.
+    """
+    global LAB_SAVE_TIMER
+    with LAB_SAVE_LOCK:
+        with LAB_INDEX_LOCK:
+            pending = LAB_SAVE_TIMER is not None
+            if pending:
+                LAB_SAVE_TIMER.cancel()
+                LAB_SAVE_TIMER = None
+        if pending:
+            LAB_INDEX.save(LAB_INDEX_PATH)
 
-    # Convert to JSON (or keep as dicts if you prefer)
-    patient_json = json.loads(json.dumps(patient, indent=2))
-    diagnosis_json = json.loads(json.dumps(diagnosis, indent=2))
-    discharge_json = json.loads(json.dumps(discharge, indent=2))
-    medication_json = json.loads(json.dumps(medication, indent=2))
+
+def index_startup_labs(umr: str):
+    """Index REPORT's labs the first time that patient's labs are asked for.
+
+    test_data is the costliest section to parse, so it is left to the first
+    lab request for REPORT's patient rather than parsed at startup.
+    """
+    global STARTUP_LABS_INDEXED
+    if REPORT is None or STARTUP_LABS_INDEXED:
+        return
+    patient = REPORT.section("patient", timeout=SECTION_TIMEOUT)
+    if not patient or patient.get("UMR No") != umr:
+        return
+    with STARTUP_LABS_LOCK:
+        if not STARTUP_LABS_INDEXED:
+            tests = REPORT.section("test_data", timeout=SECTION_TIMEOUT)
+            if tests is not None:
+                index_labs({"patient": patient, "test_data": tests})
+                STARTUP_LABS_INDEXED = True
+
+
+def load_pdf_and_extract():
+    """Start extracting the given PDF in the background; each section is parsed on first request."""
+    global REPORT, STARTUP_LABS_INDEXED
+    REPORT = LazyReport(PDF_PATH, cache=REPORT_CACHE)
+    STARTUP_LABS_INDEXED = False
+    for name in REPORT_SECTIONS.values():
+        RESPONSES.discard(("startup", name))
+    REPORT.start()
 
 # ------------------- FastAPI Events -------------------
 
 @app.on_event("startup")
 def startup_event():
-    """Load the PDF and parse data when the app starts."""
-    print("Extracting PDF data...")
+    """Start the worker pool and kick off PDF extraction without holding up startup."""
+    global REPORT_POOL
+    REPORT_POOL = ProcessPoolExecutor(max_workers=REPORT_WORKERS)
+    JOBS.pool = REPORT_POOL
+    print("Extracting PDF data in the background...")
+    if MEMORY_LIMITS is not None:
+        print("[INFO] Low-memory mode: uploads skip the incremental admissions cache")
     load_pdf_and_extract()
-    print("✅ Extraction complete. Data ready for API use.")
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    if REPORT_POOL is not None:
+        REPORT_POOL.shutdown(cancel_futures=True)
+    JOBS.close()
+    save_lab_index()
 
 
 
 @app.get("/report_home", response_class=HTMLResponse)
-def open_html():
-    with open(FRONTEND_PATH, encoding="utf-8") as file:
-        return file.read()
+def open_html(request: Request):
+    """The dashboard page, read and compressed once (again only if the file changes)."""
+    global HTML_SHELL
+    mtime = os.stat(FRONTEND_PATH).st_mtime_ns
+    encoded, read_at = HTML_SHELL
+    if encoded is None or read_at != mtime:
+        with open(FRONTEND_PATH, "rb") as file:
+            encoded = EncodedBody(file.read(), media_type="text/html; charset=utf-8")
+        HTML_SHELL = (encoded, mtime)
+    return cached_response(request, encoded)
 
 
 
@@ -70,27 +226,219 @@ def home():
     return {"message": "Patient Report API is running 🚀"}
 
 
+@app.get("/metrics")
+def get_metrics():
+    """Pipeline metrics in the Prometheus text format; rendered only when scraped."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/ready")
+def ready():
+    """Background extraction progress for PDF_PATH; 200 once its text is available."""
+    status = REPORT.status() if REPORT else {"state": "pending"}
+    return JSONResponse(content=status, status_code=200 if status["state"] == "ready" else 503)
+
+
+@app.get("/report")
+def get_report(request: Request, fields: str | None = None):
+    """Every section of REPORT (or just ?fields=patients,medication) in one response.
+
+    503 while the PDF is still being read, 404 if none of the sections could
+    be produced (e.g. extraction failed); an all-null body is never cached.
+    """
+    try:
+        names = parse_fields(fields)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    # Checked before any section is requested: each would wait up to SECTION_TIMEOUT for the text
+    status = REPORT.status() if REPORT else {"state": "pending"}
+    if status["state"] in ("pending", "extracting"):
+        return JSONResponse(content=status, status_code=503, headers={"Retry-After": "5"})
+    parts = {name: startup_section(REPORT_SECTIONS[name]) for name in names}
+    if not any(parts.values()):
+        status = REPORT.status()
+        return JSONResponse(content={**status, "error": status["error"] or "Report data not available"}, status_code=404)
+    return report_response(request, "startup", parts)
+
+
 @app.get("/patients")
-def get_patient_details():
-    if patient_json:
-        return JSONResponse(content=patient_json, status_code=200)
-    return JSONResponse(content={"error": "Patient data not available"}, status_code=404)
+def get_patient_details(request: Request):
+    return section_response(request, "patient", "Patient data not available")
 
 @app.get("/diagnosis")
-def get_diagnosis():
-    if diagnosis_json:
-        return JSONResponse(content=diagnosis_json, status_code=200)
-    return JSONResponse(content={"error": "Diagnosis data not available"}, status_code=404)
+def get_diagnosis(request: Request):
+    return section_response(request, "diagnosis", "Diagnosis data not available")
 
 @app.get("/discharge")
-def get_discharge_condition():
-    if discharge_json:
-        return JSONResponse(content=discharge_json, status_code=200)
-    return JSONResponse(content={"error": "Discharge data not available"}, status_code=404)
+def get_discharge_condition(request: Request):
+    return section_response(request, "discharge", "Discharge data not available")
 
 @app.get("/medication")
-def get_medication():
-    if medication_json:
-        return JSONResponse(content=medication_json, status_code=200)
-    return JSONResponse(content={"error": "Medication data not available"}, status_code=404)
+def get_medication(request: Request):
+    return section_response(request, "medication", "Medication data not available")
+
+
+# ------------------- Uploaded reports -------------------
+
+@app.post("/reports")
+async def upload_report(file: UploadFile = File(...)):
+    """Parse an uploaded PDF in the worker pool and return its report ID."""
+    data = await file.read()
+    loop = asyncio.get_running_loop()
+    report_id = await loop.run_in_executor(None, pdf_digest, data)
+
+    # The membership test may load the report from disk (and parse missing sections)
+    if not await loop.run_in_executor(None, REPORT_STORE.__contains__, report_id):
+        pool = REPORT_POOL
+        try:
+            report, samples = await loop.run_in_executor(
+                pool, metrics.call_collecting, partial(parse_report, limits=MEMORY_LIMITS), data, 1, REPORT_CACHE, ADMISSION_CACHE
+            )
+        except BrokenProcessPool:
+            # Not this file's fault as far as we know: any worker dying breaks every pending call
+            metrics.ERRORS.inc(stage="upload")
+            await loop.run_in_executor(None, restart_pool, pool)
+            return JSONResponse(
+                content={"error": "A parser worker died; the worker pool was restarted, please retry"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+        except Exception as e:
+            metrics.ERRORS.inc(stage="upload")
+            return JSONResponse(content={"error": f"Could not parse {file.filename}: {e}"}, status_code=422)
+        metrics.merge(samples)
+        await loop.run_in_executor(None, store_report, report_id, report)
+
+    return JSONResponse(content={"report_id": report_id}, status_code=201)
+
+
+def encode_sections(report_id: str, report: dict):
+    """Encode every served section of a freshly parsed report into RESPONSES."""
+    for name in REPORT_SECTIONS.values():
+        RESPONSES.put((report_id, name), EncodedBody.json(report[name]))
+
+
+def store_report(report_id: str, report: dict):
+    """Make a report parsed by a job available under /reports/{report_id}."""
+    REPORT_STORE.put(report_id, report)
+    encode_sections(report_id, report)
+    index_labs(report)
+
+
+JOBS = JobQueue(REPORT_POOL, on_done=store_report)
+
+
+def restart_pool(broken: ProcessPoolExecutor):
+    """Replace REPORT_POOL (shared with JOBS) once a dead worker has broken it; returns the live pool.
+
+    Every request that was waiting on the broken pool calls this, but only the
+    first one replaces it.
+    """
+    global REPORT_POOL
+    with REPORT_POOL_LOCK:
+        if REPORT_POOL is broken:
+            print("[WARNING] A worker process died; restarting the report worker pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            REPORT_POOL = ProcessPoolExecutor(max_workers=REPORT_WORKERS)
+            JOBS.pool = REPORT_POOL
+        return REPORT_POOL
+
+
+def uploaded_section(report_id: str, name: str):
+    """One section of an uploaded report from RESPONSES, else REPORT_STORE; None if the report is unknown."""
+    encoded = RESPONSES.get((report_id, name))
+    if encoded is None:
+        report = REPORT_STORE.get(report_id) if REPORT_ID.match(report_id) else None
+        if report is None:
+            return None
+        encoded = RESPONSES.put((report_id, name), EncodedBody.json(report[name]))
+    return encoded
+
+
+@app.get("/reports/{report_id}")
+def get_uploaded_report(request: Request, report_id: str, fields: str | None = None):
+    """Every section of an uploaded report (or just ?fields=...) in one response."""
+    try:
+        names = parse_fields(fields)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    parts = {}
+    for name in names:
+        parts[name] = uploaded_section(report_id, REPORT_SECTIONS[name])
+        if parts[name] is None:
+            return JSONResponse(content={"error": "Report not found"}, status_code=404)
+    return report_response(request, report_id, parts)
+
+
+@app.get("/reports/{report_id}/{section}")
+def get_report_section(request: Request, report_id: str, section: str):
+    if section not in REPORT_SECTIONS:
+        return JSONResponse(content={"error": f"Unknown section: {section}"}, status_code=404)
+    encoded = uploaded_section(report_id, REPORT_SECTIONS[section])
+    if encoded is None:
+        return JSONResponse(content={"error": "Report not found"}, status_code=404)
+    return cached_response(request, encoded)
+
+
+# ------------------- Background jobs -------------------
+
+@app.post("/jobs")
+async def submit_job(file: UploadFile = File(...)):
+    """Queue an uploaded PDF for parsing and return at once; follow it at /jobs/{job_id}/events."""
+    data = await file.read()
+    loop = asyncio.get_running_loop()
+    report_id = await loop.run_in_executor(None, pdf_digest, data)
+    # The first submit also starts the manager process that carries job events
+    submit = partial(JOBS.submit, data, report_id, REPORT_CACHE, ADMISSION_CACHE, MEMORY_LIMITS)
+    pool = REPORT_POOL
+    try:
+        job = await loop.run_in_executor(None, submit)
+    except BrokenProcessPool:
+        # Nothing of this job has run yet, so it is simply queued again on a fresh pool
+        await loop.run_in_executor(None, restart_pool, pool)
+        job = await loop.run_in_executor(None, submit)
+    return JSONResponse(
+        content={"job_id": job.id, "report_id": job.report_id, "events": f"/jobs/{job.id}/events"},
+        status_code=202,
+    )
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Job not found"}, status_code=404)
+    return JSONResponse(content=job.status(), status_code=200)
+
+
+@app.get("/jobs/{job_id}/events")
+async def get_job_events(request: Request, job_id: str):
+    """Server-Sent Events: pages read, then each section as its parser finishes, then done or error."""
+    job = JOBS.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Job not found"}, status_code=404)
+    return StreamingResponse(
+        iter_sse(job, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ------------------- Lab trends -------------------
+
+@app.get("/patients/{umr}/labs")
+def get_lab_parameters(umr: str):
+    index_startup_labs(umr)
+    if umr not in LAB_INDEX:
+        return JSONResponse(content={"error": "Patient not found"}, status_code=404)
+    return JSONResponse(content={"umr": umr, "parameters": LAB_INDEX.parameters(umr)}, status_code=200)
+
 
+@app.get("/patients/{umr}/labs/{parameter}")
+def get_lab_trend(umr: str, parameter: str, unit: str | None = None):
+    """Time series of one lab parameter across all of a patient's indexed admissions."""
+    index_startup_labs(umr)
+    series = LAB_INDEX.series(umr, parameter, unit)
+    if series is None:
+        return JSONResponse(content={"error": f"No {parameter} results for {umr}"}, status_code=404)
+    return JSONResponse(content=series, status_code=200)
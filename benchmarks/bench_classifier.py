@@ -0,0 +1,53 @@
+"""Per-page cost of section classification: legacy re.search chain vs SectionClassifier.
+
+Run from the repository root:
+    python -m benchmarks.bench_classifier
+"""
+import re
+import timeit
+
+from src.profiles import KIMS
+
+
+SAMPLE_PAGES = [
+    "PATIENT DETAILS\nPatient Name : PATEL MAHENDRAKUMAR KACHARABHAI, IP#: IPSE2526020259\n"
+    "Age/Gender : 60Y(s) 4M(s) 24D(s)/Male\nIP No. : IPSE2526020259\nUMR No. : MRSE2526029605\n"
+    "DIAGNOSIS\nINTERSTITIAL LUNG DISEASE\nTREATMENT\nBILATERAL LUNG TRANSPLANT DONE ON 16.09.2025\n" * 3,
+    "CONDITION AT THE TIME OF DISCHARGE\nPatient conscious, oriented, afebrile\n"
+    "HR: 80/min; RR:20/min, BP: 110/70mmHg\nDISCHARGE ADVICE\nIMMUNOSUPPRESSANTS:\n"
+    "TAB. TACROTEC 2MG 8AM - 8PM\nTAB. WYSOLONE 5MG 9AM\n" * 3,
+    "IP Investigations\nCOMPLETE BLOOD COUNT - 02-09-2025 10:13\nParameter\nResult\nNormal Range\n"
+    + "HAEMOGLOBIN\n11.3 gm%\n13.0 - 17.0 gm%\nCREATININE\n1.07 mg/dl\n0.7 - 1.3 mg/dl\n" * 25,
+    "CREATININE - 03-09-2025 06:12\nParameter\nResult\nNormal Range\n"
+    + "WBC COUNT\n19,540 cells/cumm\n4000 - 10000 cells/cumm\n" * 40,
+]
+
+
+def legacy_classify(page_text: str):
+    """The per-page checks extract_text_in_order ran before SectionClassifier."""
+    normalized = re.sub(r"\s+", " ", page_text)
+    return (
+        re.search(r'PATIENT DETAILS', page_text, re.IGNORECASE),
+        re.search(r'PRESENT HISTORY', page_text, re.IGNORECASE),
+        re.search(r"CONDITION AT THE TIME OF DISCHARGE", page_text, re.IGNORECASE),
+        re.search(r"I\s*P\s*[\s\-]*Investigations", page_text, re.IGNORECASE),
+        re.search(r"IP Investigations", page_text, re.IGNORECASE),
+        re.search(r"ACKNOWLEDGEMENT|SIGNATURE", page_text, re.IGNORECASE),
+        re.search(r"DISCHARGE ADVICE", page_text, re.IGNORECASE),
+        re.search(
+            r"(SURGICAL\s+GASTRO\s+REVIEW|OTHER\s+INSTRUCTIONS|INVESTIGATIONS\s+DONE|FOLLOW\s+UP)",
+            normalized,
+            re.IGNORECASE,
+        ),
+    )
+
+
+def main(number: int = 2000):
+    for name, fn in (("legacy re.search chain", legacy_classify), ("SectionClassifier.scan", KIMS.classifier.scan)):
+        seconds = timeit.timeit(lambda: [fn(page) for page in SAMPLE_PAGES], number=number)
+        per_page = seconds / (number * len(SAMPLE_PAGES)) * 1e6
+        print(f"{name:<26} {per_page:8.2f} us/page")
+
+
+if __name__ == "__main__":
+    main()
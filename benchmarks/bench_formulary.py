@@ -0,0 +1,64 @@
+"""Medication tokenizer cost as the formulary grows.
+
+Run from the repository root:
+    python -m benchmarks.bench_formulary [--sizes 100 10000 100000]
+
+Pads the shipped formulary with random drug names up to each size, then
+times building the trie and tokenizing every discharge drug line of the
+synthetic reports. The per-line time should stay flat as the size grows.
+"""
+import argparse
+import os
+import random
+import string
+import time
+
+from benchmarks.synthetic_ehr import DRUGS
+from src.formulary import Formulary, read_formulary
+from src.parsers import tokenize_medication
+from src.profiles import KIMS, TEMPLATES_DIR
+
+
+def random_names(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        words = rng.randint(1, 3)
+        yield " ".join("".join(rng.choices(string.ascii_uppercase, k=rng.randint(4, 10))) for _ in range(words)), None
+
+
+class _Profile:
+    """KIMS with a different formulary; everything else is looked up on KIMS."""
+
+    def __init__(self, formulary: Formulary):
+        self.formulary = formulary
+
+    def __getattr__(self, name):
+        return getattr(KIMS, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the medication tokenizer against formularies of growing size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    shipped = list(read_formulary(os.path.join(TEMPLATES_DIR, "formulary.csv")))
+    lines = [line for category in DRUGS.values() for line in category]
+
+    print(f"{'entries':>8} {'build (s)':>10} {'us/line':>8}")
+    for size in args.sizes:
+        started = time.perf_counter()
+        formulary = Formulary([*shipped, *random_names(max(size - len(shipped), 0))])
+        built = time.perf_counter() - started
+
+        profile = _Profile(formulary)
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            for line in lines:
+                tokenize_medication(line, profile)
+        per_line = (time.perf_counter() - started) / (args.repeat * len(lines)) * 1e6
+        print(f"{len(formulary):>8} {built:>10.2f} {per_line:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Peak memory of parse_report in the normal and low-memory modes.
+
+Run from the repository root:
+    python -m benchmarks.bench_memory [--pages 1000] [--spill-mb 4]
+
+Each mode runs in a fresh interpreter on the same synthetic PDF, with a
+ReportCache as in the API workers, and reports the process's peak RSS, the
+peak of Python allocations (tracemalloc) and the wall time.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic_ehr import make_ehr_pdf
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, resource, sys, time, tracemalloc
+from src.cache import ReportCache
+from src.pipeline import parse_report
+from utils.memory import MB, MemoryLimits
+
+pdf_path, cache_dir, spill_mb = sys.argv[1], sys.argv[2], float(sys.argv[3])
+limits = MemoryLimits(spill_bytes=int(spill_mb * MB)) if spill_mb >= 0 else None
+tracemalloc.start()
+started = time.perf_counter()
+parse_report(pdf_path, cache=ReportCache(cache_dir), limits=limits)
+seconds = time.perf_counter() - started
+print(json.dumps({
+    "seconds": seconds,
+    "python_peak_mb": tracemalloc.get_traced_memory()[1] / MB,
+    "rss_peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def measure(pdf_path: str, spill_mb: float):
+    """Run one parse in a fresh interpreter; spill_mb < 0 means the normal mode."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD, pdf_path, cache_dir, str(spill_mb)],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+        )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare peak memory of the normal and low-memory modes.")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--spill-mb", type=float, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = make_ehr_pdf(os.path.join(tmp, "ehr.pdf"), args.pages)
+        print(f"{'mode':<12} {'seconds':>8} {'python peak MB':>15} {'RSS peak MB':>12}")
+        for mode, spill_mb in (("normal", -1), ("low-memory", args.spill_mb)):
+            result = measure(pdf_path, spill_mb)
+            print(f"{mode:<12} {result['seconds']:>8.2f} {result['python_peak_mb']:>15.1f} {result['rss_peak_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
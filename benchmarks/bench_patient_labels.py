@@ -0,0 +1,94 @@
+"""extract_patient_parse: legacy per-field re.search vs the one-pass LabelScanner.
+
+Run from the repository root:
+    python -m benchmarks.bench_patient_labels
+"""
+import re
+import timeit
+
+from src.parsers import extract_patient_parse
+
+
+SAMPLE_DEMOGRAPHICS = """PATIENT DETAILS
+Patient Name : PATEL MAHENDRAKUMAR KACHARABHAI, IP#: IPSE2526020259
+Age/Gender : 60Y(s) 4M(s) 24D(s)/Male
+IP No. : IPSE2526020259
+UMR No. : MRSE2526029605
+Admn Date : 02-09-2025 06:44
+Discharge Date : 25-10-2025
+Doctor Name : DR. VIJIL RAHULAN
+Ward/Room/Bed : SUITE/SUITE-12-A/1204
+Mobile No. : 9510382080
+Address : H.NO: A301 SAAMARTH HEAVEN 6 KOBA
+Dr. SANDEEP ATTAWAR (CARDIOVASCULAR)
+Dr PRABHAT DUTTA HOD Anesthesia
+DIAGNOSIS
+INTERSTITIAL LUNG DISEASE-CHRONIC HYPERSENSITIVITY PNEUMONITIS WITH ACUTE EXACERBATION
+ISCHEMIC HEART DISEASE S/P PTCA
+TREATMENT
+VV ECMO SUPPORT FROM 04.09.2025 TO 20.09.2025
+BILATERAL LUNG TRANSPLANT DONE ON 16.09.2025
+CHIEF COMPLAINTS
+C/o Difficulty in breathing and increased oxygen requirement
+PRESENT HISTORY
+A 60 years old male who is a K/C/O ILD-chronic hypersensitivity pneumonitis on medication.
+PAST HISTORY
+Type II diabetes mellitus, systemic hypertension
+ON EXAMINATION
+Conscious, oriented
+"""
+
+# Narrative filler used to grow the block without adding more labelled fields
+FILLER = (
+    "Patient was shifted to ICU and managed with IV antibiotics, bronchodilators and\n"
+    "supportive care. Serial chest x-rays showed gradual improvement in lung fields.\n"
+)
+
+
+def legacy_extract_patient_parse(text: str):
+    """extract_patient_parse as it was before LabelScanner."""
+    patient_details = {}
+
+    patterns = {
+        "Patient Name": r'Patient Name\s*:\s*(.+?)(?=\s*IP#|$)',
+        "Age/Gender": r'Age/Gender\s*:\s*(.+)',
+        "IP No": r'IP No\.\s*:\s*(.+)',
+        "UMR No": r'UMR No\.\s*:\s*(.+)',
+        "Admission Date": r'Admn Date\s*:\s*(.+)',
+        "Discharge Date": r'Discharge Date\s*:\s*(.+)',
+        "Doctor Name": r'Doctor Name\s*:\s*(.+)',
+        "Ward/Room/Bed": r'Ward/Room/Bed\s*:\s*(.+)',
+        "Mobile No": r'Mobile No\.\s*:\s*(.+)',
+        "Address": r'Address\s*:\s*(.+)',
+        "Prime Consultant": r'Doctor Name\s*:\s*(.+)',
+    }
+
+    for field, pattern in patterns.items():
+        match = re.search(pattern, text, re.IGNORECASE)
+        patient_details[field] = match.group(1).strip() if match else None
+
+    care_team_pattern = r'^\s*(Dr\.?\s+[A-Z][a-zA-Z\s]*(?:\([A-Za-z]+\))?)\s*'
+    care_team = re.findall(care_team_pattern, text, re.MULTILINE | re.IGNORECASE)
+    care_team = care_team[-2:]
+    patient_details["Care Team"] = [re.sub(r'[\n\s\xa0]+', ' ', d).strip() for d in care_team]
+    return patient_details
+
+
+def build_block(scale: int):
+    """The sample demographics block grown to roughly `scale` times its size."""
+    filler_lines = len(SAMPLE_DEMOGRAPHICS) * (scale - 1) // len(FILLER)
+    return SAMPLE_DEMOGRAPHICS + FILLER * filler_lines
+
+
+def main():
+    for scale, number in ((1, 2000), (10, 300), (100, 30)):
+        text = build_block(scale)
+        assert extract_patient_parse(text) == legacy_extract_patient_parse(text)
+        legacy = timeit.timeit(lambda: legacy_extract_patient_parse(text), number=number) / number * 1e6
+        scanner = timeit.timeit(lambda: extract_patient_parse(text), number=number) / number * 1e6
+        print(f"{scale:>4}x ({len(text):>7} chars)  legacy {legacy:10.1f} us  scanner {scanner:10.1f} us  "
+              f"speedup {legacy / scanner:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Per-request cost of the section endpoints: JSONResponse from the dict vs pre-encoded bodies.
+
+Run from the repository root:
+    python -m benchmarks.bench_responses [pdf_path]
+
+Times only the response building (no network): serializing the parsed
+section on every request, serving the cached EncodedBody (plain and gzip),
+and answering a poll whose If-None-Match is still current with a 304.
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+from fastapi.responses import JSONResponse
+from starlette.requests import Request
+
+from app import cached_response
+from benchmarks.synthetic_ehr import make_ehr_pdf
+from src.pipeline import parse_report
+from src.responses import EncodedBody
+
+
+def make_request(**headers):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    }
+    return Request(scope)
+
+
+def main(pdf_path: str | None = None, number: int = 5000):
+    if pdf_path is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            report = parse_report(make_ehr_pdf(os.path.join(tmp, "ehr.pdf"), 20))
+    else:
+        report = parse_report(pdf_path)
+
+    print(f"{'section':<12} {'bytes':>7} {'JSONResponse':>13} {'cached':>9} {'cached gzip':>12} {'304':>8}  (us/request)")
+    for name in ("patient", "diagnosis", "discharge", "medication", "test_data"):
+        content = report[name]
+        encoded = EncodedBody.json(content)
+        plain = make_request()
+        gzip_request = make_request(accept_encoding="gzip, deflate")
+        revalidate = make_request(if_none_match=encoded.etag)
+
+        timings = [
+            timeit.timeit(lambda: JSONResponse(content=content), number=number),
+            timeit.timeit(lambda: cached_response(plain, encoded), number=number),
+            timeit.timeit(lambda: cached_response(gzip_request, encoded), number=number),
+            timeit.timeit(lambda: cached_response(revalidate, encoded), number=number),
+        ]
+        per_request = [seconds / number * 1e6 for seconds in timings]
+        print(f"{name:<12} {len(encoded.body):>7} {per_request[0]:>13.1f} {per_request[1]:>9.1f} {per_request[2]:>12.1f} {per_request[3]:>8.1f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
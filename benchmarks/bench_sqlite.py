@@ -0,0 +1,53 @@
+"""Bulk-write throughput of save_reports_to_sqlite on synthetic parsed reports.
+
+Run from the repository root:
+    python -m benchmarks.bench_sqlite [report_count]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from src.storage import save_reports_to_sqlite
+
+
+def fake_report(i: int):
+    """A parse_report-shaped dict with a typical number of medication and lab rows."""
+    return {
+        "source_file": f"KIMS _ EHR ({i}).pdf",
+        "patient": {
+            "Patient Name": f"PATIENT {i}", "Age/Gender": "60Y(s)/Male", "IP No": f"IPSE{i:010d}",
+            "UMR No": f"MRSE{i // 3:010d}", "Admission Date": f"{i % 28 + 1:02d}-09-2025 06:44",
+            "Discharge Date": "25-10-2025", "Doctor Name": "DR. VIJIL RAHULAN",
+            "Prime Consultant": "DR. VIJIL RAHULAN", "Ward/Room/Bed": "SUITE/SUITE-12-A/1204",
+            "Mobile No": "9510382080", "Address": "H.NO: A301", "Care Team": ["Dr. SANDEEP ATTAWAR"],
+        },
+        "diagnosis": {"Diagnosis": "INTERSTITIAL LUNG DISEASE\nSYSTEMIC HYPERTENSION", "Treatment": "LUNG TRANSPLANT"},
+        "discharge": {"condition_summary": "Patient conscious, oriented"},
+        "medication": {"IMMUNOSUPPRESSANTS": [
+            {"line": "TAB. TACROTEC 2MG 8AM - 8PM", "form": "TAB", "drug": "TACROTEC", "generic": "TACROLIMUS",
+             "strength": "2MG", "schedule": "8AM - 8PM", "duration": None},
+            {"line": "TAB. WYSOLONE 5MG 9AM", "form": "TAB", "drug": "WYSOLONE", "generic": "PREDNISOLONE",
+             "strength": "5MG", "schedule": "9AM", "duration": None},
+        ]},
+        "test_data": {
+            f"CREATININE - {day + 1:02d}-10-2025 06:00": [
+                {"Parameter": "CREATININE", "Result": "1.07 mg/dl", "Normal Range": "0.7 - 1.3 mg/dl"}
+            ]
+            for day in range(10)
+        },
+    }
+
+
+def main(count: int = 100_000, batch_size: int = 10_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "reports.db")
+        started = time.perf_counter()
+        for start in range(0, count, batch_size):
+            save_reports_to_sqlite([fake_report(i) for i in range(start, min(start + batch_size, count))], db_path)
+        seconds = time.perf_counter() - started
+        print(f"{count} reports in {seconds:.1f}s ({count / seconds:,.0f} reports/s)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
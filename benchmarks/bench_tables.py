@@ -0,0 +1,96 @@
+"""Table extraction cost: tabula (JVM) vs native fitz find_tables on a ruled lab-table PDF.
+
+Run from the repository root:
+    python -m benchmarks.bench_tables [page_count]
+
+The PDF has as many ruled non-lab pages (charts) in front of the IP
+Investigations pages as lab pages. fitz is timed scanning every page and
+scanning only the test_data pages, which is what extract_lab_tables does by
+default. tabula needs Java on PATH; without it it is skipped.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import fitz
+
+from src.extractors import extract_lab_tables
+
+
+LAB_ROWS = [
+    ("HAEMOGLOBIN", "11.3 gm%", "13.0 - 17.0 gm%"),
+    ("WBC COUNT", "19,540 cells/cumm", "4000 - 10000 cells/cumm"),
+    ("PLATELET COUNT", "2.1 Lakhs/Cumm", "1.5 - 4.1 Lakhs/Cumm"),
+    ("CREATININE", "1.07 mg/dl", "0.66 - 1.25 mg/dl"),
+    ("SODIUM", "136 mmol/L", "137 - 145 mmol/L"),
+    ("POTASSIUM", "4.2 mmol/L", "3.5 - 5.1 mmol/L"),
+]
+
+
+def _ruled_table(page, rows, widths, top: int = 70):
+    for r, row in enumerate(rows):
+        y = top + r * 18
+        x = 40
+        for width, cell in zip(widths, row):
+            page.draw_rect(fitz.Rect(x, y, x + width, y + 18), color=(0, 0, 0), width=0.5)
+            page.insert_text((x + 3, y + 13), cell, fontsize=8)
+            x += width
+
+
+def lab_table_pdf(path: str, pages: int, other_pages: int = 0):
+    """Write `other_pages` ruled chart pages, then `pages` with one ruled Parameter/Result/Normal Range table each."""
+    doc = fitz.open()
+    for number in range(other_pages):
+        page = doc.new_page()
+        page.insert_text((40, 50), f"VITALS CHART DAY {number + 1}", fontsize=10)
+        _ruled_table(page, [("Time", "HR", "BP", "SpO2"), *[(f"{h:02d}:00", "80", "110/70", "98%") for h in range(0, 24, 1)]], (120, 100, 120, 100))
+    for number in range(pages):
+        page = doc.new_page()
+        if number == 0:
+            page.insert_text((40, 30), "IP Investigations", fontsize=10)
+        page.insert_text((40, 50), f"COMPLETE BLOOD COUNT - {number % 28 + 1:02d}-09-2025 10:13", fontsize=10)
+        _ruled_table(page, [("Parameter", "Result", "Normal Range"), *LAB_ROWS * 4], (180, 140, 200))
+    doc.save(path)
+    doc.close()
+
+
+def time_fitz(path: str, pages=None):
+    started = time.perf_counter()
+    tables = extract_lab_tables(path, pages)
+    return time.perf_counter() - started, sum(len(t["rows"]) for t in tables)
+
+
+def time_tabula(path: str):
+    try:
+        import tabula
+    except ImportError:
+        return None, "tabula-py not installed"
+    started = time.perf_counter()
+    try:
+        frames = tabula.read_pdf(path, pages="all", multiple_tables=True)
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}".splitlines()[0]
+    return time.perf_counter() - started, sum(len(frame) for frame in frames)
+
+
+def main(pages: int = 50):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "labs.pdf")
+        lab_table_pdf(path, pages, other_pages=pages)
+
+        seconds, rows = time_fitz(path, range(2 * pages))
+        print(f"fitz, all pages:  {seconds:.3f}s for {2 * pages} pages, {rows} rows")
+
+        seconds, rows = time_fitz(path)
+        print(f"fitz, test_data:  {seconds:.3f}s for {2 * pages} pages, {rows} rows")
+
+        seconds, rows = time_tabula(path)
+        if seconds is None:
+            print(f"tabula: skipped ({rows})")
+        else:
+            print(f"tabula (JVM):     {seconds:.3f}s for {2 * pages} pages, {rows} rows")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,79 @@
+"""Import-time budget for the CLI, the API and the modules every worker loads.
+
+Run from the repository root:
+    python -m benchmarks.import_budget [--scale 1.5]
+
+Each module is imported in a fresh interpreter with `-X importtime`. The run
+fails (exit 1) if a cumulative import time exceeds its budget, or if a heavy
+optional dependency is loaded at import time instead of inside the function
+that needs it. `--scale` stretches the budgets for slower machines.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module -> budget in milliseconds for a cold `import module`
+BUDGETS_MS = {
+    "src.extractors": 300,
+    "src.parsers": 300,
+    "src.pipeline": 350,
+    "main": 350,
+    "app": 1000,
+}
+
+# Only the functions that use these may import them
+DEFERRED_MODULES = ("pandas", "pdfplumber", "tabula", "groq", "pyarrow")
+
+
+def import_profile(module: str):
+    """{imported module: cumulative microseconds} for a fresh `import module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check cold import times against their budgets.")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget by this factor")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<16} {'import (ms)':>12} {'budget (ms)':>12}")
+    for module, budget in BUDGETS_MS.items():
+        profile = import_profile(module)
+        took = profile.get(module, 0) / 1000
+        limit = budget * args.scale
+        print(f"{module:<16} {took:>12.1f} {limit:>12.0f}")
+        if took > limit:
+            failures.append(f"{module} took {took:.0f}ms (budget {limit:.0f}ms)")
+        for heavy in DEFERRED_MODULES:
+            if heavy in profile:
+                failures.append(f"import {module} loads {heavy} ({profile[heavy] / 1000:.0f}ms)")
+
+    if failures:
+        for failure in failures:
+            print(f"[ERROR] {failure}")
+        sys.exit(1)
+    print("✅ All imports within budget")
+
+
+if __name__ == "__main__":
+    main()
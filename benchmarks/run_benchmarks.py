@@ -0,0 +1,138 @@
+"""Time text extraction, page cleaning and every section parser on synthetic PDFs.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks [--pages 10 100 1000] [--repeat 3]
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<older commit>.json
+
+Results are written to benchmarks/results/<commit>.json (best of --repeat
+runs, in seconds) so a later commit can be compared against them.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import fitz
+
+from benchmarks.synthetic_ehr import make_ehr_pdf
+from src.document import SECTION_ORDER
+from src.extractors import extract_text_in_order
+from src.pipeline import SECTION_PARSERS
+from utils.cleaners import BoilerplateStripper, clean_page_text
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def best_of(repeat: int, func, *args):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def raw_page_blocks(pdf_path: str):
+    """(y, text) blocks per page, as _read_page returns them before cleaning."""
+    with fitz.open(pdf_path) as doc:
+        return [
+            [(b[1], b[4].strip()) for b in sorted(page.get_text("blocks"), key=lambda b: (b[1], b[0])) if b[4].strip()]
+            for page in doc
+        ]
+
+
+def strip_boilerplate(pages):
+    stripper = BoilerplateStripper()
+    for blocks in pages:
+        stripper.observe(blocks)
+    return [stripper.strip(blocks) for blocks in pages]
+
+
+def bench_pdf(pdf_path: str, repeat: int):
+    timings = {"extract_text_in_order": best_of(repeat, extract_text_in_order, pdf_path)}
+
+    pages = raw_page_blocks(pdf_path)
+    texts = ["\n".join(text for _, text in blocks) for blocks in pages]
+    timings["clean_page_text"] = best_of(repeat, lambda: [clean_page_text(text) for text in texts])
+    timings["strip_boilerplate"] = best_of(repeat, strip_boilerplate, pages)
+
+    sections = dict(zip(SECTION_ORDER, extract_text_in_order(pdf_path)))
+    for parser, section in SECTION_PARSERS.values():
+        timings[parser.__name__] = best_of(repeat, parser, sections[section])
+    return timings
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, dirty
+
+
+def compare(old: dict, new: dict, threshold: float = 1.10):
+    """Print old vs new timings; returns the number of regressions beyond `threshold`."""
+    regressions = 0
+    print(f"\n{'pages':>6} {'benchmark':<28} {'old (s)':>10} {'new (s)':>10} {'ratio':>7}")
+    for pages, timings in new["results"].items():
+        for name, seconds in timings.items():
+            before = old["results"].get(pages, {}).get(name)
+            if before is None:
+                continue
+            ratio = seconds / before if before else float("inf")
+            marker = "  ← slower" if ratio > threshold else ""
+            regressions += ratio > threshold
+            print(f"{pages:>6} {name:<28} {before:>10.4f} {seconds:>10.4f} {ratio:>6.2f}x{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction and parsing on synthetic EHR PDFs.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    commit, dirty = git_commit()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            pdf_path = make_ehr_pdf(os.path.join(tmp, f"ehr_{pages}.pdf"), pages, args.seed)
+            timings = bench_pdf(pdf_path, args.repeat)
+            results[str(pages)] = timings
+            print(f"{pages} pages: " + ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in timings.items()))
+
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "pymupdf": fitz.VersionBind,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"✅ Results saved → {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(json.load(file), report)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
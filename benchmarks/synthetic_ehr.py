@@ -0,0 +1,185 @@
+"""Synthetic KIMS-style discharge summary PDFs for benchmarks.
+
+Run from the repository root:
+    python -m benchmarks.synthetic_ehr out.pdf [--pages 100] [--seed 0]
+
+The layout follows the real reports: a printed-at / patient header and a
+KIMS footer on every page, PATIENT DETAILS, DIAGNOSIS/TREATMENT, history,
+CONDITION AT THE TIME OF DISCHARGE, DISCHARGE ADVICE drug lists by category,
+FOLLOW UP, then IP Investigations filling the remaining pages with one day
+of tests after another.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+import fitz
+
+
+LINES_PER_PAGE = 62
+FOOTER = "Krishna Institute Of Medical Sciences Limited\nKIMS-/CS/EF/03 Website: www.kims.com"
+
+FIRST_NAMES = ["MAHENDRAKUMAR", "SURESH", "LAKSHMI", "RAVI", "ANITHA", "VENKATESH", "FATIMA", "JOHN"]
+LAST_NAMES = ["PATEL", "REDDY", "RAO", "SHARMA", "KHAN", "NAIDU", "VARGHESE", "GUPTA"]
+DOCTORS = ["DR. VIJIL RAHULAN", "DR. SANDEEP ATTAWAR", "DR. PRABHAT DUTTA", "DR. K. SRINIVAS"]
+DIAGNOSES = [
+    "INTERSTITIAL LUNG DISEASE", "SYSTEMIC HYPERTENSION", "TYPE 2 DIABETES MELLITUS",
+    "CHRONIC KIDNEY DISEASE STAGE 3", "COMMUNITY ACQUIRED PNEUMONIA", "HYPOTHYROIDISM",
+]
+TREATMENTS = ["BILATERAL LUNG TRANSPLANT DONE ON 16.09.2025", "CONSERVATIVE MANAGEMENT", "IV ANTIBIOTICS"]
+
+DRUGS = {
+    "IMMUNOSUPPRESSANTS": ["TAB. TACROTEC 2MG 8AM - 8PM", "TAB. WYSOLONE 5MG 9AM", "TAB. MYCEPT 500MG 8AM - 8PM"],
+    "CARDIAC DRUGS": ["TAB.ELIQUIS 5MG 9AM-9PM X 1 WEEK", "TAB. METXL 25MG 9AM", "TAB. ECOSPRIN 75MG 2PM"],
+    "GI DRUGS": ["TAB. PAN 40MG 6AM(B/F)-6PM (B/F)", "SYP LOOZ 15ML 9PM", "TAB. EMESET 4MG SOS"],
+    "ANTIBIOTICS": ["TAB. SEPTRAN DS 1 TAB 2PM (MON/WED/FRI)", "TAB. VALCIVIR 450MG 9AM"],
+    "OTHERS": ["TAB. SHELCAL 500MG 2PM", "TAB. THYRONORM 50MCG 6AM", "NEB. DUOLIN 6TH HOURLY"],
+}
+
+# Test -> [(parameter, unit, low, high)]
+LAB_TESTS = {
+    "COMPLETE BLOOD COUNT": [
+        ("HAEMOGLOBIN", "gm%", 13.0, 17.0), ("HAEMATOCRIT(PCV)", "Vol%", 40.0, 50.0),
+        ("RBC COUNT", "Millions/cumm", 4.5, 5.5), ("WBC COUNT", "cells/cumm", 4000, 10000),
+        ("PLATELET COUNT", "Lakhs/Cumm", 1.5, 4.1), ("NEUTROPHILS", "%", 40, 80), ("LYMPHOCYTES", "%", 20, 40),
+    ],
+    "CREATININE": [("CREATININE", "mg/dl", 0.66, 1.25)],
+    "BLOOD UREA": [("BLOOD UREA", "mg/dl", 19, 43)],
+    "ELECTROLYTES": [("SODIUM", "mmol/L", 137, 145), ("POTASSIUM", "mmol/L", 3.5, 5.1), ("CHLORIDE", "mmol/L", 98, 107)],
+    "ARTERIAL BLOOD GASES (ABG)": [
+        ("PH", "", 7.35, 7.45), ("PCO2", "mmHg", 35, 45), ("PO2", "mmHg", 80, 100), ("HCO3", "mmol/L", 22, 26),
+    ],
+    "TACROLIMUS": [("TACROLIMUS LEVEL", "ng/ml", 5, 15)],
+}
+
+
+def _patient(rng: random.Random):
+    ip_no = f"IPSE{rng.randrange(10**9, 10**10)}"
+    return {
+        "name": f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)}",
+        "ip_no": ip_no,
+        "umr_no": f"MRSE{rng.randrange(10**9, 10**10)}",
+        "age": f"{rng.randint(18, 90)}Y(s) {rng.randint(0, 11)}M(s) {rng.randint(0, 30)}D(s)",
+        "gender": rng.choice(["Male", "Female"]),
+        "doctor": rng.choice(DOCTORS),
+        "mobile": f"9{rng.randrange(10**8, 10**9)}",
+        "admitted": datetime(2025, 9, 1, 6, 44) + timedelta(days=rng.randint(0, 30)),
+    }
+
+
+def _front_pages(rng: random.Random, patient: dict, stay_days: int):
+    """The four pages before the drug list spills onto the first investigations page."""
+    discharged = patient["admitted"] + timedelta(days=stay_days)
+    details = [
+        "PATIENT DETAILS",
+        f"Patient Name : {patient['name']}, IP#: {patient['ip_no']}",
+        f"Age/Gender : {patient['age']}/{patient['gender']}",
+        f"IP No. : {patient['ip_no']}",
+        f"UMR No. : {patient['umr_no']}",
+        f"Admn Date : {patient['admitted']:%d-%m-%Y %H:%M}",
+        f"Discharge Date : {discharged:%d-%m-%Y}",
+        f"Doctor Name : {patient['doctor']}",
+        f"Ward/Room/Bed : SUITE/SUITE-{rng.randint(1, 20)}-A/{rng.randint(1000, 1400)}",
+        f"Mobile No. : {patient['mobile']}",
+        "Address : H.NO: A301 SAAMARTH HEAVEN 6 KOBA",
+        *[f"{doctor.title()} (CONSULTANT)" for doctor in rng.sample(DOCTORS, 2)],
+        "DIAGNOSIS",
+        *rng.sample(DIAGNOSES, rng.randint(1, 4)),
+        "TREATMENT",
+        rng.choice(TREATMENTS),
+    ]
+    history = [
+        "CHIEF COMPLAINTS",
+        "C/o Difficulty in breathing since 2 months",
+        "PRESENT HISTORY",
+        *["Patient was evaluated and managed as per protocol." for _ in range(rng.randint(2, 6))],
+        "PAST HISTORY",
+        "Type II DM, on regular medication",
+    ]
+    course = [
+        "COURSE IN HOSPITAL",
+        *["Patient improved gradually with treatment." for _ in range(rng.randint(3, 10))],
+    ]
+    condition = [
+        "CONDITION AT THE TIME OF DISCHARGE",
+        "Patient conscious, oriented, afebrile, No pallor",
+        "Tracheostomy insitu+",
+        f"HR: {rng.randint(60, 100)}/min; RR:{rng.randint(14, 24)}/min, BP: {rng.randint(100, 140)}/{rng.randint(60, 90)}mmHg",
+        "CVS: S1, S2 (+); RS: BAE (+); P/A: Soft;",
+        f"On {discharged - timedelta(days=1):%d/%m/%Y} HB: {rng.uniform(8, 14):.1f} gm/dl Cr: {rng.uniform(0.5, 2):.2f} mg/dl.",
+        "DISCHARGE ADVICE",
+    ]
+    for category in rng.sample(list(DRUGS), rng.randint(2, len(DRUGS))):
+        condition.append(f"{category}:")
+        condition.extend(rng.sample(DRUGS[category], rng.randint(1, len(DRUGS[category]))))
+    return [details, history, course, condition]
+
+
+FOLLOW_UP = [
+    "FOLLOW UP",
+    "Review after 1 week with reports",
+    "For any emergency contact 040-44885100 or 040-27845555 or attend Casualty at any",
+    "time.",
+    "INVESTIGATIONS DONE DURING THE COURSE OF STAY",
+    "IP Investigations",
+]
+
+
+def _lab_day(rng: random.Random, day: datetime):
+    lines = []
+    for test in rng.sample(list(LAB_TESTS), rng.randint(2, len(LAB_TESTS))):
+        collected = day + timedelta(hours=rng.randint(6, 20), minutes=rng.randint(0, 59))
+        lines += [f"{test} - {collected:%d-%m-%Y %H:%M}", "Parameter", "Result", "Normal Range"]
+        for parameter, unit, low, high in LAB_TESTS[test]:
+            value = rng.uniform(low * 0.7, high * 1.3)
+            digits = 2 if high < 10 else 1 if high < 1000 else 0
+            lines += [
+                parameter,
+                f"{value:.{digits}f} {unit}".strip(),
+                f"{low} - {high} {unit}".strip(),
+            ]
+    return lines
+
+
+def make_ehr_pdf(path: str, pages: int = 20, seed: int = 0):
+    """Write a synthetic discharge summary of exactly `pages` pages (minimum 5) to `path`."""
+    rng = random.Random(seed)
+    patient = _patient(rng)
+    header = f"{patient['admitted'] + timedelta(days=40):%d-%m-%Y} 10:10 AM\nPatient Name: {patient['name']}, IP#: {patient['ip_no']}"
+    pages = max(pages, 5)
+    front = _front_pages(rng, patient, stay_days=pages)
+
+    # Follow-up and the investigations run on from page 5 to the last page
+    ending = ["ACKNOWLEDGEMENT", "I have understood the instructions given to me", "SIGNATURE"]
+    room = (pages - len(front)) * LINES_PER_PAGE - len(ending)
+    body = list(FOLLOW_UP)
+    day = patient["admitted"]
+    while len(body) < room:
+        body += _lab_day(rng, day)
+        day += timedelta(days=1)
+    body = body[:room] + ending
+
+    doc = fitz.open()
+    chunks = front + [body[i:i + LINES_PER_PAGE] for i in range(0, len(body), LINES_PER_PAGE)]
+    for lines in chunks:
+        page = doc.new_page()
+        page.insert_text((40, 30), header, fontsize=8)
+        page.insert_text((40, 62), "\n".join(lines), fontsize=8, lineheight=1.4)
+        page.insert_text((40, 810), FOOTER, fontsize=7)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic KIMS-style discharge PDF.")
+    parser.add_argument("output")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    make_ehr_pdf(args.output, args.pages, args.seed)
+    print(f"✅ {args.pages} pages → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,48 @@
-from src.extractors import extract_text, extract_text_in_order,extract_tables
-from src.parsers import extract_patient_parse, demographics_parse
-from src.storage import save_to_csv,save_to_json
-import src.parsers as par
-import json
-
-
-def main():
-    pdf_path = r"D:\Nikhil\python\report_analysis\data\raw\KIMS _ EHR (19).pdf"
-
-    # Extract all sections
-    all_text, patient_demographics, discharge_text, medication_text,test_data,follow_up= extract_text_in_order(pdf_path)
+import argparse
+import os
 
+from src.batch import OUTPUT_FORMATS, run_batch
+from utils.memory import MB, MemoryLimits
 
 
-    patient = extract_patient_parse(patient_demographics)
-    diagnosis = demographics_parse(patient_demographics)
-    discharge = par.discharge_condition_parse(discharge_text)
-    medication=par.medication_parse(medication_text)
-    # full_test_data=par.test_reports_parse(test_data)
-    # print(patient,diagnosis,discharge,medication)
-    # print(json.dumps(patient,indent=2))
-    print(json.dumps(diagnosis,indent=2))
-    # print(json.dumps(discharge,indent=2))
-    # print(json.dumps(medication,indent=2))
-
-    patient_json=json.dumps(patient,indent=2)
-    diagnosis_json=json.dumps(diagnosis,indent=2)
-    discharge_json=json.dumps(discharge,indent=2)
-    medication_json=json.dumps(medication,indent=2)
-    # print(patient_json,diagnosis_json,discharge_json,medication_json)
- 
-    
-
-    # Save outputs
-    # save_to_csv(diagnosis, "diagnosis.csv")
-    # save_to_csv(patient, "patient.csv")
-    # save_to_csv(discharge, "discharge.csv")
+def main():
+    parser = argparse.ArgumentParser(description="Parse KIMS EHR discharge PDFs in bulk.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("--output-dir", default=os.path.join("data", "processed"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="PDFs parsed in parallel (each file's pages are read by one process)")
+    parser.add_argument("--batch-size", type=int, default=50, help="files per bulk write")
+    parser.add_argument("--cache-dir", default=None, help="reuse parsed results from this ReportCache directory")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="json", help="file format for the parsed sections")
+    parser.add_argument("--sqlite", default=None, help="write to this SQLite database instead of JSON files")
+    parser.add_argument("--append", action="store_true", help="append to existing output files (json, jsonl, sqlite)")
+    parser.add_argument("--low-memory", action="store_true", help="read one page at a time and spill page text to disk")
+    parser.add_argument("--spill-mb", type=float, default=16, help="page text kept in memory per file in --low-memory mode")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="fail a file whose worker grows past this RSS (--low-memory)")
+    args = parser.parse_args()
+    if args.append and args.format == "parquet" and not args.sqlite:
+        parser.error("--append is not supported with --format parquet (Parquet files cannot be appended to)")
+
+    limits = None
+    if args.low_memory:
+        limits = MemoryLimits(
+            spill_bytes=int(args.spill_mb * MB),
+            max_rss_bytes=int(args.max_rss_mb * MB) if args.max_rss_mb else None,
+        )
+
+    summary = run_batch(
+        args.inputs,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        overwrite=not args.append,
+        cache_dir=args.cache_dir,
+        sqlite_path=args.sqlite,
+        output_format=args.format,
+        limits=limits,
+    )
+    for pdf_path, error in summary["failed"]:
+        print(f"  ✗ {pdf_path}: {error}")
 
-    # save_to_json(diagnosis, "diagnosis.json")
-    # save_to_json(patient, "patient.json")
-    # save_to_json(discharge, "discharge.json")
-    # save_to_json(medication,"medication.json")
-    # save_to_json(test_data,"test_data.json")
 
 if __name__ == "__main__":
     main()
-
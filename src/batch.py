@@ -0,0 +1,150 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+from src.cache import ReportCache
+from src.pipeline import parse_report
+from src.storage import JsonArrayWriter, JsonlWriter, ParquetWriter, save_reports_to_sqlite, section_rows
+
+SECTIONS = ("patient", "diagnosis", "discharge", "medication", "test_data")
+OUTPUT_FORMATS = ("json", "jsonl", "jsonl.gz", "parquet")
+
+
+def collect_pdf_paths(inputs):
+    """Expand files, directories and glob patterns into a sorted list of PDF paths."""
+    if isinstance(inputs, str):
+        inputs = [inputs]
+
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True)
+        elif os.path.isfile(item):
+            matches = [item]
+        else:
+            matches = glob.glob(item, recursive=True)
+        paths.update(m for m in matches if m.lower().endswith(".pdf"))
+    return sorted(paths)
+
+
+@lru_cache(maxsize=4)
+def _caches(cache_dir: str):
+    """The worker's (report, admissions) caches, kept for the whole run so their size index is too."""
+    return ReportCache(cache_dir), ReportCache(os.path.join(cache_dir, "admissions"))
+
+
+def _process_file(pdf_path: str, cache_dir: str | None = None, limits=None):
+    """Worker entry point: parse one PDF, returning (path, sections, error) instead of raising."""
+    try:
+        cache, admissions = _caches(cache_dir) if cache_dir else (None, None)
+        return pdf_path, parse_report(pdf_path, cache=cache, admissions=admissions, limits=limits), None
+    except Exception as e:
+        return pdf_path, None, f"{type(e).__name__}: {e}"
+
+
+def _open_writers(output_format, output_dir, overwrite):
+    """One streaming writer per section for the json/jsonl/parquet formats."""
+    if output_format == "parquet":
+        return {s: ParquetWriter(os.path.join(output_dir, f"{s}.parquet"), s) for s in SECTIONS}
+    if output_format.startswith("jsonl"):
+        return {s: JsonlWriter(os.path.join(output_dir, f"{s}.{output_format}"), append=not overwrite) for s in SECTIONS}
+    return {s: JsonArrayWriter(os.path.join(output_dir, f"{s}.json"), append=not overwrite) for s in SECTIONS}
+
+
+def _flush(reports, sqlite_path, writers):
+    if sqlite_path:
+        save_reports_to_sqlite(reports, sqlite_path)
+    else:
+        # Parquet writers keep buffering up to their own row-group size.
+        for section, writer in writers.items():
+            for report in reports:
+                if isinstance(writer, JsonlWriter):
+                    writer.write({"source_file": report["source_file"], **report[section]})
+                else:
+                    # One row per test parameter / drug line: a column per test header grows with every file
+                    for row in section_rows(section, report[section], report["source_file"]):
+                        writer.write(row)
+            if not isinstance(writer, ParquetWriter):
+                writer.flush()
+    reports.clear()
+
+
+def run_batch(
+    inputs,
+    output_dir: str = os.path.join("data", "processed"),
+    workers: int = os.cpu_count() or 1,
+    batch_size: int = 50,
+    overwrite: bool = True,
+    cache_dir: str | None = None,
+    sqlite_path: str | None = None,
+    output_format: str = "json",
+    limits=None,
+):
+    """Parse every PDF under `inputs` across a process pool and save the sections in bulk.
+
+    A file that fails is reported and skipped; the rest of the batch carries on.
+    If a worker dies and breaks the pool, the files it left pending are reported
+    as failed and the reports parsed so far are still written.
+    Results are buffered and written through src.storage once every
+    `batch_size` files rather than once per record. With `cache_dir`, files
+    already parsed under the current code version are read from the ReportCache,
+    and a re-exported version of a known IP No only re-extracts its changed pages.
+    `output_format` picks JSON arrays or Parquet files of one row per test
+    parameter / drug line (storage.section_rows), or newline-delimited JSON
+    (optionally gzipped) of one record per file, in `output_dir`; with `sqlite_path`,
+    batches go to that SQLite database instead. Parquet output cannot be
+    appended to, so overwrite=False with parquet raises ValueError. With `limits` (a
+    utils.memory.MemoryLimits) every file is parsed in low-memory mode, and a
+    file that would push its worker past the RSS ceiling fails on its own.
+    """
+    if output_format == "parquet" and not overwrite and not sqlite_path:
+        # ParquetWriter can only replace a file, which would silently drop earlier runs
+        raise ValueError("Parquet output cannot be appended to; write to a new --output-dir instead")
+    paths = collect_pdf_paths(inputs)
+    if not paths:
+        print(f"[WARNING] No PDF files found for {inputs}")
+        return {"processed": 0, "failed": [], "seconds": 0.0, "files_per_second": 0.0}
+    if limits is not None and cache_dir:
+        print("[INFO] Low-memory mode: re-exported admissions are parsed in full, not incrementally")
+
+    reports = []
+    failed = []
+    processed = 0
+    started = time.perf_counter()
+    writers = {} if sqlite_path else _open_writers(output_format, output_dir, overwrite)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_process_file, path, cache_dir, limits): path for path in paths}
+            for future in as_completed(futures):
+                try:
+                    pdf_path, sections, error = future.result()
+                except Exception as e:
+                    # A worker that crashed or was OOM-killed breaks the pool: every file
+                    # still pending fails here, and the reports already buffered are kept
+                    pdf_path, sections, error = futures[future], None, f"{type(e).__name__}: {e}"
+                if error:
+                    print(f"[ERROR] {pdf_path}: {error}")
+                    failed.append((pdf_path, error))
+                    continue
+
+                reports.append({"source_file": os.path.basename(pdf_path), **sections})
+                processed += 1
+
+                if len(reports) >= batch_size:
+                    _flush(reports, sqlite_path, writers)
+                    elapsed = time.perf_counter() - started
+                    print(f"[INFO] {processed}/{len(paths)} files, {processed / elapsed:.2f} files/s")
+
+        if reports:
+            _flush(reports, sqlite_path, writers)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    seconds = time.perf_counter() - started
+    files_per_second = (processed + len(failed)) / seconds if seconds else 0.0
+    print(f"✅ {processed} parsed, {len(failed)} failed in {seconds:.1f}s ({files_per_second:.2f} files/s)")
+    return {"processed": processed, "failed": failed, "seconds": seconds, "files_per_second": files_per_second}
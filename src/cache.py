@@ -0,0 +1,152 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(ROOT_DIR, "data", "cache")
+# A ReportCache re-reads its directory at most once per this many writes (or per
+# as many writes as it has entries, whichever is more), to pick up other processes' entries
+RESCAN_WRITES = 100
+
+# Any edit to these files changes the version stamp and so invalidates every cached entry.
+VERSIONED_SOURCES = (
+    os.path.join(ROOT_DIR, "utils", "cleaners.py"),
+    os.path.join(ROOT_DIR, "src", "document.py"),
+    os.path.join(ROOT_DIR, "src", "extractors.py"),
+    os.path.join(ROOT_DIR, "src", "parsers.py"),
+    os.path.join(ROOT_DIR, "src", "profiles.py"),
+    os.path.join(ROOT_DIR, "src", "formulary.py"),
+    os.path.join(ROOT_DIR, "src", "pipeline.py"),
+    *sorted(glob.glob(os.path.join(ROOT_DIR, "src", "templates", "*.json"))),
+    *sorted(glob.glob(os.path.join(ROOT_DIR, "src", "templates", "*.csv"))),
+    # The local formulary changes the parsed drug names just like a template does
+    *([os.environ["REPORT_FORMULARY"]] if os.path.isfile(os.environ.get("REPORT_FORMULARY", "")) else []),
+)
+
+
+@lru_cache(maxsize=1)
+def code_version():
+    """Short hash of the cleaner/extractor/parser sources, the template profiles and the formularies."""
+    digest = hashlib.sha256()
+    for path in VERSIONED_SOURCES:
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+def pdf_digest(source):
+    """SHA-256 of the PDF bytes; `source` is a file path or the raw bytes."""
+    if isinstance(source, (bytes, bytearray)):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ReportCache:
+    """On-disk cache of extracted sections and parsed dicts, keyed by PDF hash + code version.
+
+    Entries are single JSON files; reads bump the file's mtime, and writes evict
+    the least recently used entries (plus any from older code versions) once the
+    directory grows past `max_bytes`. Sizes and recency are tracked in memory,
+    so a write does not list the directory; it is re-scanned only now and then
+    to account for entries written by other processes.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._sizes = None  # entry path -> size in bytes, least recently used first
+        self._total = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Sent to worker processes with each job: the lock cannot be pickled and the index is per process
+        state = self.__dict__.copy()
+        state.update(_sizes=None, _total=0, _writes=0, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str):
+        return os.path.join(self.cache_dir, f"{digest}-{code_version()}.json")
+
+    def get(self, digest: str):
+        path = self._path(digest)
+        try:
+            with open(path, encoding="utf-8") as file:
+                entry = json.load(file)
+            os.utime(path)
+            with self._lock:
+                if self._sizes is not None and path in self._sizes:
+                    self._sizes.move_to_end(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[WARNING] Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def put(self, digest: str, entry: dict):
+        path = self._path(digest)
+        tmp_path = None
+        try:
+            # Created on the first write, so merely constructing a cache touches no disk
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # A unique name per write: threads of one process may store the same digest at once
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=os.path.basename(path), suffix=".tmp")
+            with open(fd, "w", encoding="utf-8") as file:
+                json.dump(entry, file, ensure_ascii=False, separators=(",", ":"))
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"[WARNING] Failed to write cache entry {path}: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._evict(path, size)
+
+    def _evict(self, path: str, size: int):
+        with self._lock:
+            if self._sizes is None or self._writes >= max(RESCAN_WRITES, len(self._sizes)):
+                self._scan()
+            self._writes += 1
+            self._total += size - self._sizes.get(path, 0)
+            self._sizes[path] = size
+            self._sizes.move_to_end(path)
+            while self._total > self.max_bytes and len(self._sizes) > 1:
+                old_path, old_size = self._sizes.popitem(last=False)
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+                self._total -= old_size
+
+    def _scan(self):
+        """Rebuild the size index from the directory, deleting entries from older code versions."""
+        version_suffix = f"-{code_version()}.json"
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                if not entry.name.endswith(version_suffix):
+                    os.remove(entry.path)
+                    continue
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, entry.path, stat.st_size))
+        self._sizes = OrderedDict((path, size) for _, path, size in sorted(entries))
+        self._total = sum(self._sizes.values())
+        self._writes = 0
@@ -0,0 +1,144 @@
+import tempfile
+from bisect import bisect_right
+
+# Output of extract_text_in_order -> separator appended after each page in it
+SECTION_SEPARATORS = {
+    "all_text": "\n",
+    "patient_demographics": "\n",
+    "discharge_text": "\n\n",
+    "medication": "\n",
+    "test_data": "\n",
+}
+
+# Order of the tuple returned by extract_text_in_order
+SECTION_ORDER = ("all_text", "patient_demographics", "discharge_text", "medication", "test_data", "follow_up")
+
+
+class SpooledPages:
+    """Append-only list of page texts in a SpooledTemporaryFile: in memory up to max_size bytes, then on disk."""
+
+    def __init__(self, max_size: int):
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_size)
+        self._spans = []  # (offset, length) of each page's UTF-8 bytes
+        self._end = 0
+
+    def append(self, text: str):
+        data = text.encode("utf-8")
+        self._file.seek(self._end)
+        self._file.write(data)
+        self._spans.append((self._end, len(data)))
+        self._end += len(data)
+
+    def __len__(self):
+        return len(self._spans)
+
+    def __getitem__(self, index: int):
+        offset, length = self._spans[index]
+        self._file.seek(offset)
+        return self._file.read(length).decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def spilled(self):
+        return self._file._rolled
+
+    def close(self):
+        self._file.close()
+
+
+class Document:
+    """Cleaned pages of one PDF, each stored once, with sections kept as lists of page indices.
+
+    Section text is joined lazily on first use (and cached), and offsets in a
+    section's text can be mapped back to the PDF page they came from. With
+    `spill_bytes`, pages are kept in SpooledPages and joined text is not cached.
+    """
+
+    def __init__(self, spill_bytes: int | None = None):
+        self.low_memory = spill_bytes is not None
+        self.pages = SpooledPages(spill_bytes) if self.low_memory else []
+        self.page_numbers = []
+        self.sections = {name: [] for name in SECTION_SEPARATORS}
+        self.profile = None  # name of the template profile the pages were split with
+        self.error = None  # why the PDF could not be opened, if it could not
+        self._texts = {}
+        self._starts = {}
+
+    @classmethod
+    def from_sections(cls, texts, profile=None):
+        """Document from already-joined section strings (e.g. a cache entry), one pseudo-page each."""
+        doc = cls()
+        doc.profile = profile
+        for name, text in zip(SECTION_ORDER, texts):
+            if name in doc.sections and text:
+                doc.add_page(None, text, [name])
+        return doc
+
+    def add_page(self, number, text: str, sections):
+        index = len(self.pages)
+        self.pages.append(text)
+        self.page_numbers.append(number)
+        for name in sections:
+            self.sections[name].append(index)
+            self._texts.pop(name, None)
+            self._starts.pop(name, None)
+
+    def section_pages(self, name: str):
+        """PDF page numbers (0-based) that make up a section."""
+        return [self.page_numbers[i] for i in self.sections.get(name, ())]
+
+    def section_texts(self, name: str):
+        """Yield the text of each page in a section, one page at a time."""
+        for i in self.sections.get(name, ()):
+            yield self.pages[i]
+
+    def text(self, name: str):
+        """A section's text, joined exactly as extract_text_in_order returns it."""
+        if name in self._texts:
+            return self._texts[name]
+        separator = SECTION_SEPARATORS.get(name, "")
+        text = "".join(page + separator for page in self.section_texts(name)).strip()
+        if not self.low_memory:
+            self._texts[name] = text
+        return text
+
+    def page_at(self, name: str, offset: int):
+        """PDF page number holding character `offset` of text(name), or None."""
+        if name not in self._starts:
+            separator = SECTION_SEPARATORS.get(name, "")
+            starts = []
+            position = 0
+            for i in self.sections.get(name, ()):
+                starts.append(position)
+                position += len(self.pages[i]) + len(separator)
+            # text() strips leading whitespace, which shifts every offset
+            joined_start = next((i for i in self.sections.get(name, ()) if self.pages[i].strip()), None)
+            lead = 0
+            if joined_start is not None:
+                page = self.pages[joined_start]
+                lead = starts[self.sections[name].index(joined_start)] + len(page) - len(page.lstrip())
+            self._starts[name] = (starts, lead)
+
+        starts, lead = self._starts[name]
+        if not starts or offset < 0:
+            return None
+        index = bisect_right(starts, offset + lead) - 1
+        return self.page_numbers[self.sections[name][index]]
+
+    def find_page(self, name: str, value: str):
+        """PDF page number where `value` first appears in a section, or None."""
+        if not value:
+            return None
+        offset = self.text(name).find(value)
+        return self.page_at(name, offset) if offset != -1 else None
+
+    def as_tuple(self):
+        """The six strings returned by extract_text_in_order."""
+        return tuple(self.text(name) for name in SECTION_ORDER)
+
+    def close(self):
+        """Release the temporary file of a low-memory Document."""
+        if self.low_memory:
+            self.pages.close()
@@ -0,0 +1,86 @@
+import csv
+import os
+import re
+from functools import lru_cache
+
+
+# A large local formulary (CSV: name,generic) merged into every profile's own list
+FORMULARY_ENV = "REPORT_FORMULARY"
+
+WORD = re.compile(r"[A-Z0-9]+")
+_END = ""  # trie key holding the (name, generic) that ends at a node; words are never empty
+
+
+def words(text: str):
+    """Upper-case alphanumeric words of `text`, the unit formulary names are matched in."""
+    return WORD.findall(text.upper())
+
+
+class Formulary:
+    """Drug names (brand or generic) -> generic name, stored in a word-level trie.
+
+    The trie is built once; looking a name up walks at most as many nodes as
+    the longest name has words, so matching a line costs the same whether the
+    formulary holds a hundred names or a hundred thousand.
+    """
+
+    def __init__(self, entries=()):
+        self._root = {}
+        self._size = 0
+        for name, generic in entries:
+            self.add(name, generic)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, name: str, generic: str | None = None):
+        name_words = words(name)
+        if not name_words:
+            return
+        node = self._root
+        for word in name_words:
+            node = node.setdefault(word, {})
+        if _END not in node:
+            self._size += 1
+        display = " ".join(name_words)
+        node[_END] = (display, " ".join(words(generic)) if generic and words(generic) else display)
+
+    def match(self, line_words, start: int = 0):
+        """(end index, name, generic) of the longest name starting at line_words[start], or None."""
+        node = self._root
+        found = None
+        for index in range(start, len(line_words)):
+            node = node.get(line_words[index])
+            if node is None:
+                break
+            if _END in node:
+                found = (index + 1, *node[_END])
+        return found
+
+
+def read_formulary(path: str):
+    """Yield (name, generic) rows from a CSV with a name,generic header; a blank generic means the name is one."""
+    with open(path, encoding="utf-8", newline="") as file:
+        for row in csv.DictReader(file):
+            name = (row.get("name") or "").strip()
+            if name and not name.startswith("#"):
+                yield name, (row.get("generic") or "").strip() or name
+
+
+@lru_cache(maxsize=8)
+def load_formulary(paths: tuple):
+    """One Formulary built from every readable CSV in `paths`, cached per process."""
+    formulary = Formulary()
+    for path in paths:
+        try:
+            for name, generic in read_formulary(path):
+                formulary.add(name, generic)
+        except OSError as e:
+            print(f"[WARNING] Could not read formulary {path}: {e}")
+    return formulary
+
+
+def formulary_paths(*paths):
+    """`paths` plus the REPORT_FORMULARY file if that is set, as a load_formulary key."""
+    local = os.environ.get(FORMULARY_ENV)
+    return tuple(path for path in (*paths, local) if path)
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import multiprocessing
+import threading
+import uuid
+from collections import OrderedDict
+
+from src.pipeline import parse_report
+from utils import metrics
+
+
+# Seconds between SSE keep-alive comments while a job has nothing new
+KEEPALIVE_SECONDS = 15
+TERMINAL_EVENTS = ("done", "error")
+
+
+class Job:
+    """One submitted PDF and every event it has produced, replayable by any number of streams.
+
+    Event data is JSON-encoded once when it arrives, not once per listener.
+    Streams wait on an asyncio.Event of their own, which emit() sets on the
+    stream's event loop, so a waiting stream does not hold a thread.
+    """
+
+    def __init__(self, job_id: str, report_id: str):
+        self.id = job_id
+        self.report_id = report_id
+        self.state = "queued"
+        self.error = None
+        self.pages_done = 0
+        self.pages_total = None
+        self.report = {}
+        self.events = []
+        self._lock = threading.Lock()
+        self._listeners = set()
+
+    @property
+    def finished(self):
+        return self.state in ("done", "failed")
+
+    def emit(self, event: str, data: dict):
+        with self._lock:
+            if event == "started":
+                self.state = "running"
+            elif event == "pages":
+                self.state = "extracting"
+                self.pages_done, self.pages_total = data["done"], data["total"]
+            elif event == "section":
+                self.state = "parsing"
+                self.report[data["section"]] = data["data"]
+            elif event == "done":
+                self.state = "done"
+            elif event == "error":
+                self.state = "failed"
+                self.error = data["error"]
+            self.events.append((event, json.dumps(data, ensure_ascii=False)))
+            listeners = list(self._listeners)
+        for loop, wakeup in listeners:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass  # the stream's loop has closed
+
+    def since(self, after: int):
+        """Events from index `after` on, without waiting."""
+        with self._lock:
+            return self.events[after:]
+
+    def listen(self, listener):
+        with self._lock:
+            self._listeners.add(listener)
+
+    def unlisten(self, listener):
+        with self._lock:
+            self._listeners.discard(listener)
+
+    def status(self):
+        return {
+            "job_id": self.id,
+            "report_id": self.report_id,
+            "state": self.state,
+            "pages_done": self.pages_done,
+            "pages_total": self.pages_total,
+            "sections": list(self.report),
+            "error": self.error,
+        }
+
+
+async def iter_sse(job: Job, last_event_id: str | None = None):
+    """The job's events as Server-Sent Events, resuming after Last-Event-ID; ends after done/error."""
+    after = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+    wakeup = asyncio.Event()
+    listener = (asyncio.get_running_loop(), wakeup)
+    job.listen(listener)
+    try:
+        while True:
+            # Cleared before looking, so an event emitted in between still sets it
+            wakeup.clear()
+            events = job.since(after)
+            if not events:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                continue
+            for event, data in events:
+                yield f"id: {after}\nevent: {event}\ndata: {data}\n\n"
+                after += 1
+                if event in TERMINAL_EVENTS:
+                    return
+    finally:
+        job.unlisten(listener)
+
+
+def run_job(job_id: str, events, pdf, cache=None, admissions=None, limits=None):
+    """Worker entry point: parse one PDF, sending (job_id, event, data) tuples to `events`.
+
+    Sends a pages event per page read, a section event as each parser
+    finishes, then done (carrying the worker's metrics) or error.
+    """
+    def progress(done, total):
+        events.put((job_id, "pages", {"done": done, "total": total}))
+
+    def on_section(name, parsed):
+        events.put((job_id, "section", {"section": name, "data": parsed}))
+
+    try:
+        events.put((job_id, "started", {}))
+        _, samples = metrics.call_collecting(
+            parse_report, pdf, 1, cache, admissions, progress=progress, on_section=on_section, limits=limits
+        )
+    except Exception as e:
+        events.put((job_id, "error", {"error": f"{type(e).__name__}: {e}"}))
+        return
+    events.put((job_id, "done", {"metrics": samples}))
+
+
+class JobQueue:
+    """Jobs run by run_job in a process pool; their events come back over one managed queue.
+
+    A single thread moves events from that queue onto the Job objects, so a
+    job's events keep the order its worker sent them in. `on_done(report_id,
+    report)` runs before the done event is published, e.g. to store the report.
+    """
+
+    def __init__(self, pool, on_done=None, max_finished: int = 64):
+        self.pool = pool
+        self.on_done = on_done
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._manager = None
+        self._events = None
+
+    def _event_queue(self):
+        # The manager is a separate process, so it is only started by the first job
+        with self._lock:
+            if self._events is None:
+                self._manager = multiprocessing.Manager()
+                self._events = self._manager.Queue()
+                threading.Thread(target=self._pump, name="job-events", daemon=True).start()
+            return self._events
+
+    def submit(self, pdf, report_id: str, cache=None, admissions=None, limits=None):
+        """Register a job and queue it on the pool; if the pool refuses it, nothing is registered and the error is raised."""
+        events = self._event_queue()
+        job = Job(uuid.uuid4().hex, report_id)
+        # Registered before it can run, or the pump would drop its first events
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        try:
+            future = self.pool.submit(run_job, job.id, events, pdf, cache, admissions, limits)
+        except Exception:
+            with self._lock:
+                del self._jobs[job.id]
+            raise
+        job.emit("queued", {"job_id": job.id, "report_id": report_id})
+        future.add_done_callback(lambda f: self._check_worker(job, f))
+        return job
+
+    def _check_worker(self, job: Job, future):
+        # run_job reports its own errors; this only catches a worker that died or a cancelled job
+        if future.cancelled():
+            self._events.put((job.id, "error", {"error": "Cancelled before it ran"}))
+        elif future.exception() is not None:
+            self._events.put((job.id, "error", {"error": f"Worker failed: {future.exception()}"}))
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _pump(self):
+        while True:
+            try:
+                job_id, event, data = self._events.get()
+            except (EOFError, OSError):
+                return
+            job = self.get(job_id)
+            if job is None or job.finished:
+                continue
+            if event == "done":
+                metrics.merge(data.pop("metrics"))
+                data["report_id"] = job.report_id
+                if self.on_done is not None:
+                    try:
+                        self.on_done(job.report_id, job.report)
+                    except Exception as e:
+                        print(f"[ERROR] Could not store report {job.report_id}: {e}")
+                        event, data = "error", {"error": str(e)}
+            if event == "error":
+                metrics.ERRORS.inc(stage="job")
+            job.emit(event, data)
+
+    def close(self):
+        if self._manager is not None:
+            self._manager.shutdown()
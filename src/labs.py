@@ -0,0 +1,274 @@
+import os
+import re
+import threading
+
+import numpy as np
+
+
+LAB_TEST_HEADER = re.compile(r"([^\n]*?)\s*-\s*(\d{2})-(\d{2})-(\d{4})\s*(\d{2}:\d{2})\s*$")
+LAB_VALUE = re.compile(r"\s*(?:[<>]=?)?\s*(-?\d[\d,]*(?:\.\d+)?)(?:\s*([A-Za-z%].*?))?\s*")
+LAB_RANGE = re.compile(r"\s*(-?\d+(?:\.\d+)?)\s*(?:-|to)\s*(-?\d+(?:\.\d+)?)\s*(.*?)\s*")
+LAB_BOUND = re.compile(r"\s*([<>])=?\s*(\d+(?:\.\d+)?)\s*(.*?)\s*")
+
+LAB_COLUMNS = ("test", "parameter", "collected_at", "value", "unit", "ref_low", "ref_high")
+
+
+def parse_test_header(header: str):
+    """Split a raw test header into (test name, ISO timestamp), dropping stray text before it."""
+    match = LAB_TEST_HEADER.search(header.strip())
+    if not match:
+        return header.strip(), None
+    name, day, month, year, time = match.groups()
+    return name.strip(), f"{year}-{month}-{day}T{time}"
+
+
+def parse_lab_value(result: str):
+    """'11.3 gm%' -> (11.3, 'gm%'); free text gives (nan, '')."""
+    match = LAB_VALUE.fullmatch(result or "")
+    if not match:
+        return np.nan, ""
+    return float(match.group(1).replace(",", "")), match.group(2) or ""
+
+
+def parse_reference_range(normal_range: str):
+    """'13.0 - 17.0 gm%' -> (13.0, 17.0, 'gm%'); '>= 85 ml/min' -> (85.0, nan, 'ml/min')."""
+    text = normal_range or ""
+    match = LAB_RANGE.fullmatch(text)
+    if match:
+        return float(match.group(1)), float(match.group(2)), match.group(3)
+    match = LAB_BOUND.fullmatch(text)
+    if match:
+        bound = float(match.group(2))
+        if match.group(1) == ">":
+            return bound, np.nan, match.group(3)
+        return np.nan, bound, match.group(3)
+    return np.nan, np.nan, ""
+
+
+class LabTable:
+    """Typed lab results for a stay, one NumPy array per column.
+
+    Strings are fixed-width unicode arrays, `collected_at` is datetime64[m] and
+    values/reference bounds are float64 with NaN where the report has none, so
+    filters and abnormal flags are single vectorized operations over the stay.
+    """
+
+    def __init__(self, test, parameter, collected_at, value, unit, ref_low, ref_high):
+        self.test = np.asarray(test, dtype=str)
+        self.parameter = np.asarray(parameter, dtype=str)
+        self.collected_at = np.asarray(collected_at, dtype="datetime64[m]")
+        self.value = np.asarray(value, dtype=np.float64)
+        self.unit = np.asarray(unit, dtype=str)
+        self.ref_low = np.asarray(ref_low, dtype=np.float64)
+        self.ref_high = np.asarray(ref_high, dtype=np.float64)
+
+    @classmethod
+    def from_tests(cls, tests: dict):
+        """Build from test_reports_parse output: {raw test header: parameter rows}."""
+        columns = {name: [] for name in LAB_COLUMNS}
+        for header, rows in (tests or {}).items():
+            test, collected_at = parse_test_header(header)
+            for row in rows:
+                value, unit = parse_lab_value(row.get("Result"))
+                ref_low, ref_high, range_unit = parse_reference_range(row.get("Normal Range"))
+                columns["test"].append(test)
+                columns["parameter"].append((row.get("Parameter") or "").strip())
+                columns["collected_at"].append(collected_at or "NaT")
+                columns["value"].append(value)
+                columns["unit"].append(unit or range_unit)
+                columns["ref_low"].append(ref_low)
+                columns["ref_high"].append(ref_high)
+        return cls(**columns)
+
+    @classmethod
+    def concat(cls, tables):
+        tables = list(tables)
+        if not tables:
+            return cls.from_tests({})
+        return cls(**{name: np.concatenate([getattr(t, name) for t in tables]) for name in LAB_COLUMNS})
+
+    def __len__(self):
+        return len(self.value)
+
+    def select(self, mask):
+        """Rows where the boolean `mask` (or index array) is set, as a new LabTable."""
+        return LabTable(**{name: getattr(self, name)[mask] for name in LAB_COLUMNS})
+
+    def flags(self):
+        """-1 below the reference range, 1 above it, 0 otherwise (including no value/range)."""
+        low = self.value < self.ref_low
+        high = self.value > self.ref_high
+        return high.astype(np.int8) - low.astype(np.int8)
+
+    def abnormal(self):
+        """Boolean mask of results outside their reference range."""
+        return (self.value < self.ref_low) | (self.value > self.ref_high)
+
+    def to_arrow(self):
+        """pyarrow Table with the same columns (string columns dictionary-encoded)."""
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("LabTable.to_arrow needs pyarrow: pip install pyarrow") from e
+
+        columns = {}
+        for name in LAB_COLUMNS:
+            array = getattr(self, name)
+            if array.dtype.kind == "U":
+                columns[name] = pa.array(array.tolist(), pa.string()).dictionary_encode()
+            elif array.dtype.kind == "M":
+                columns[name] = pa.array(array.astype("datetime64[s]"), pa.timestamp("s"))
+            else:
+                columns[name] = pa.array(array, from_pandas=True)
+        columns["flag"] = pa.array(self.flags())
+        return pa.table(columns)
+
+
+def lab_key(parameter: str):
+    """Index key for a parameter name: 'Haemoglobin ' and 'HAEMOGLOBIN' match."""
+    return " ".join(parameter.split()).upper()
+
+
+class LabTrendIndex:
+    """Per-patient, per-parameter lab time series across admissions.
+
+    add() is called once per parsed report and re-sorts only that patient's
+    rows, precomputing min/max/last/delta for every parameter, so series() is a
+    dict lookup that never touches PDFs or parsers. A patient's series are
+    rebuilt off to the side and swapped in whole, so series() needs no lock
+    and never sees a half-rebuilt patient. save()/load() keep the index in
+    one .npz file between restarts.
+    """
+
+    def __init__(self):
+        self._admissions = {}  # UMR No -> {IP No: LabTable}
+        # UMR No -> ({lab_key: {unit: (stats, LabTable, IP Nos)}}, {(lab_key, unit): series() result})
+        self._patients = {}
+        self._lock = threading.Lock()
+
+    def add(self, patient: dict, tests: dict):
+        """Index a report's labs under its UMR No; a re-parsed IP No replaces the old one."""
+        umr = (patient or {}).get("UMR No")
+        if not umr:
+            return False
+        ip_no = patient.get("IP No") or ""
+        table = LabTable.from_tests(tests)
+        with self._lock:
+            self._admissions.setdefault(umr, {})[ip_no] = table
+            self._rebuild(umr)
+        return True
+
+    def _rebuild(self, umr: str):
+        admissions = self._admissions[umr]
+        table = LabTable.concat(admissions.values())
+        ip_nos = np.repeat(np.array(list(admissions), dtype=str), [len(t) for t in admissions.values()])
+        keep = np.isfinite(table.value)
+        table, ip_nos = table.select(keep), ip_nos[keep]
+        keys = np.array([lab_key(p) for p in table.parameter.tolist()], dtype=str)
+
+        # One run per (parameter, unit), each sorted by collection time
+        order = np.lexsort((ip_nos, table.collected_at, table.unit, keys))
+        table, ip_nos, keys = table.select(order), ip_nos[order], keys[order]
+        breaks = np.flatnonzero((keys[1:] != keys[:-1]) | (table.unit[1:] != table.unit[:-1])) + 1
+        starts = np.concatenate(([0], breaks)) if len(keys) else breaks
+        stops = np.append(starts[1:], len(keys))
+
+        series = {}
+        for start, stop in zip(starts.tolist(), stops.tolist()):
+            values = table.value[start:stop]
+            stats = {
+                "count": stop - start,
+                "min": values.min().item(),
+                "max": values.max().item(),
+                "last": values[-1].item(),
+                "delta": (values[-1] - values[-2]).item() if stop - start > 1 else None,
+            }
+            unit = table.unit[start].item()
+            group = (stats, table.select(slice(start, stop)), ip_nos[start:stop])
+            series.setdefault(keys[start].item(), {})[unit] = group
+        self._patients[umr] = (series, {})
+
+    def series(self, umr: str, parameter: str, unit: str | None = None):
+        """Sorted readings plus min/max/last/delta (last minus previous reading), or None.
+
+        A parameter reported in several units is split per unit; without `unit`,
+        the unit with the most readings is returned.
+        """
+        key = lab_key(parameter)
+        series, responses = self._patients.get(umr, ({}, {}))
+        units = series.get(key)
+        if not units:
+            return None
+        if unit is None:
+            unit = max(units, key=lambda u: units[u][0]["count"])
+        if unit not in units:
+            return None
+
+        response = responses.get((key, unit))
+        if response is None:
+            stats, table, ip_nos = units[unit]
+            response = {
+                "umr": umr,
+                "parameter": key,
+                "unit": unit,
+                "units": sorted(units),
+                **stats,
+                "series": [
+                    {"collected_at": None if at == "NaT" else at, "value": value, "flag": flag, "ip_no": ip_no}
+                    for at, value, flag, ip_no in zip(
+                        np.datetime_as_string(table.collected_at).tolist(),
+                        table.value.tolist(),
+                        table.flags().tolist(),
+                        ip_nos.tolist(),
+                    )
+                ],
+            }
+            responses[(key, unit)] = response
+        return response
+
+    def parameters(self, umr: str):
+        series, _ = self._patients.get(umr, ({}, {}))
+        return sorted(series)
+
+    def __contains__(self, umr: str):
+        return umr in self._admissions
+
+    def save(self, path: str):
+        with self._lock:
+            rows = [(umr, ip_no, table) for umr, admissions in self._admissions.items() for ip_no, table in admissions.items()]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        table = LabTable.concat(t for _, _, t in rows)
+        sizes = [len(t) for _, _, t in rows]
+        columns = {name: getattr(table, name) for name in LAB_COLUMNS}
+        columns["umr"] = np.repeat(np.array([r[0] for r in rows], dtype=str), sizes)
+        columns["ip_no"] = np.repeat(np.array([r[1] for r in rows], dtype=str), sizes)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(tmp_path, **columns)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """Index saved by save(); an empty index if the file is missing or unreadable."""
+        index = cls()
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                columns = {name: data[name] for name in (*LAB_COLUMNS, "umr", "ip_no")}
+        except FileNotFoundError:
+            return index
+        except Exception as e:
+            print(f"[WARNING] Ignoring unreadable lab index {path}: {e}")
+            return index
+
+        table = LabTable(**{name: columns[name] for name in LAB_COLUMNS})
+        pairs = np.char.add(np.char.add(columns["umr"], "\t"), columns["ip_no"])
+        unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(unique_pairs) + 1))
+        for i, pair in enumerate(unique_pairs.tolist()):
+            umr, ip_no = pair.split("\t", 1)
+            index._admissions.setdefault(umr, {})[ip_no] = table.select(order[bounds[i]:bounds[i + 1]])
+        for umr in index._admissions:
+            index._rebuild(umr)
+        return index
@@ -1,61 +1,36 @@
 import re
 from src.extractors import remove_header_text
-from groq import Groq
-import json
-import textwrap
+from src.formulary import WORD
+from src.profiles import KIMS, Profile
+from utils.cleaners import remove_garbage
+from utils.metrics import parser_metrics
 
-def extract_patient_parse(text: str):
-    """Extract structured patient details from text."""
-    # print("=" * 40, "Patient Details", "=" * 40)
-    patient_details = {}
-
-    patterns = {
-        "Patient Name": r'Patient Name\s*:\s*(.+?)(?=\s*IP#|$)',
-        "Age/Gender": r'Age/Gender\s*:\s*(.+)',
-        "IP No": r'IP No\.\s*:\s*(.+)',
-        "UMR No": r'UMR No\.\s*:\s*(.+)',
-        "Admission Date": r'Admn Date\s*:\s*(.+)',
-        "Discharge Date": r'Discharge Date\s*:\s*(.+)',
-        "Doctor Name": r'Doctor Name\s*:\s*(.+)',
-        "Ward/Room/Bed": r'Ward/Room/Bed\s*:\s*(.+)',
-        "Mobile No": r'Mobile No\.\s*:\s*(.+)',
-        "Address": r'Address\s*:\s*(.+)',
-        "Prime Consultant": r'Doctor Name\s*:\s*(.+)',
-    }
+# Section patterns, labels and headings come from the document's template
+# profile (src/templates/*.json); every parser defaults to the KIMS one.
 
-    for field, pattern in patterns.items():
-        match = re.search(pattern, text, re.IGNORECASE)
-        patient_details[field] = match.group(1).strip() if match else None
+WHITESPACE = re.compile(r'[\n\s\xa0]+')
+SPACES = re.compile(r"\s+")
+CATEGORY_HEADING = re.compile(r"^[A-Z][A-Z\s]*:$")
 
-    care_team_pattern = r'^\s*(Dr\.?\s+[A-Z][a-zA-Z\s]*(?:\([A-Za-z]+\))?)\s*'
-    care_team = re.findall(care_team_pattern, text, re.MULTILINE | re.IGNORECASE)
-    care_team = care_team[-2:]
-    patient_details["Care Team"] = [re.sub(r'[\n\s\xa0]+', ' ', d).strip() for d in care_team]
 
-    # for k, v in patient_details.items():
-    #     if k == "Care Team":
-    #         print(f"{k}:")
-    #         for doc in v:
-    #             print(" -", doc)
-    #     else:
-    #         print(f"{k}: {v}")
+@parser_metrics
+def extract_patient_parse(text: str, profile: Profile = KIMS):
+    """Extract structured patient details from text."""
+    patient_details, care_team = profile.patient_scanner.scan(text)
+
+    care_team = care_team[-2:]
+    patient_details["Care Team"] = [WHITESPACE.sub(' ', d).strip() for d in care_team]
 
     return patient_details
 
 
-def demographics_parse(text: str):
+@parser_metrics
+def demographics_parse(text: str, profile: Profile = KIMS):
     """Extract diagnosis and treatment sections with clean formatting."""
     diagnosis = {}
-    patterns = {
-        "Diagnosis": r"DIAGNOSIS\s*(.+?)\s*(?=TREATMENT)",
-        "Treatment": r"TREATMENT\s*(.+?)(?=\n\s*Patient Name:|\n\d{2}-\d{2}-\d{4}|$)",
-        "Chief Complaints": r"CHIEF COMPLAINTS\S*(.+?)(?=\n\s*PRESENT HISTORY)",
-        "Present History": r"PRESENT HISTORY\S*(.+?)(?=\n\s*PAST HISTORY)",
-        "Past History": r"PAST HISTORY\S*(.+?)(?=\n\s*ON EXAMINATION)"
-    }
 
-    for field, pattern in patterns.items():
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+    for field, pattern in profile.history_fields.items():
+        match = pattern.search(text)
         value = match.group(1).strip() if match else None
 
         if value:
@@ -67,36 +42,20 @@ def demographics_parse(text: str):
 
         diagnosis[field] = clean_value
 
-    # print("=" * 40, "Diagnosis & Treatment", "=" * 40)
-    # for field, value in diagnosis.items():
-    #     print(f"{field}:\n{value}\n")
-
     return diagnosis
-def discharge_condition_parse(text: str):
-    discharge = {}
 
-    pattern = (
-        r"CONDITION\s*(?:AT\s+THE\s+TIME\s+OF\s+)?DISCHARGE[:\s-]*"
-        r"([\s\S]+?)(?=\bDISCHARGE\s+ADVICE\b|$)"
-    )
 
-    match = re.search(pattern, text, re.IGNORECASE)
-    discharge["condition"] = match.group(1).strip() if match else None
-
-    return discharge
-
-
-def discharge_condition_parse(text: str):
+@parser_metrics
+def discharge_condition_parse(text: str, profile: Profile = KIMS):
     discharge = {}
 
     # First extract the discharge condition block
-    pattern = r"CONDITION AT THE TIME OF DISCHARGE\s*(.+?)\s*(?=DISCHARGE ADVICE|$)"
-    match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+    match = profile.discharge_block.search(text)
     if not match:
         return {"condition": None}
 
     block = match.group(1)
-    block = re.sub(r"\xa0", " ", block)  # clean non-breaking spaces
+    block = block.replace("\xa0", " ")  # clean non-breaking spaces
 
     # --- Split into sections ---
     lines = [l.strip() for l in block.splitlines() if l.strip()]
@@ -104,57 +63,98 @@ def discharge_condition_parse(text: str):
     # 1️⃣ General condition summary
     summary_lines = []
     for l in lines:
-        if re.match(r"^(Patient|No pallor|On \d{1,2}/\d{1,2}/\d{4})", l, re.IGNORECASE):
+        if profile.discharge_summary_line.match(l):
             summary_lines.append(l)
         else:
             break
     discharge["condition_summary"] = " ".join(summary_lines)
 
     # 2️⃣ Devices / tubes present
-    device_lines = [l for l in lines if "insitu" in l.lower()]
+    device_lines = [l for l in lines if profile.discharge_device_keyword in l.lower()]
     discharge["devices"] = device_lines if device_lines else None
 
     # 3️⃣ Vitals
-    vitals_match = re.search(
-        r"HR[:\s]*[\d/]+.*?(BP[:\s]*[^\n]*)", block, re.IGNORECASE
-    )
+    vitals_match = profile.discharge_vitals.search(block)
     discharge["vitals"] = vitals_match.group(0).strip() if vitals_match else None
 
  
     systems = {}
-    for sys in ["CVS", "RS", "P/A", "CNS"]:
-        m = re.search(rf"{sys}[:\s]*(.*?)(?:;|$)", block)
+    for sys, pattern in profile.discharge_systems.items():
+        m = pattern.search(block)
         if m:
             systems[sys] = m.group(1).strip()
     discharge["systems"] = systems if systems else None
 
     # 5️⃣ Lab results (with date)
     labs = []
-    lab_pattern = re.compile(
-        r"On\s+(\d{1,2}/\d{1,2}/\d{4})\s*(.+?)(?=On\s+\d{1,2}/\d{1,2}/\d{4}|$)",
-        re.DOTALL | re.IGNORECASE
-    )
-    for date, details in lab_pattern.findall(block):
-        labs.append({"date": date, "details": re.sub(r"\s+", " ", details).strip()})
+    for date, details in profile.discharge_labs.findall(block):
+        labs.append({"date": date, "details": SPACES.sub(" ", details).strip()})
     discharge["lab_results"] = labs if labs else None
 
     return discharge
-def medication_parse(text:str):
+
+
+# "X 1 WEEK", "FOR 5 DAYS", "TILL REVIEW", ...
+DURATION = re.compile(
+    r"\s*\b(?:X|FOR)\s*(\d+\s*(?:DAYS?|WEEKS?|WKS?|MONTHS?))\b|\s*\b((?:TILL|UNTIL)\s+(?:NEXT\s+)?REVIEW|LIFE\s*LONG)\b",
+    re.IGNORECASE,
+)
+# Dose right after the drug name: "2MG", "500/125 MG", "15ML", "1 TAB", "2 PUFFS"
+STRENGTH = re.compile(
+    r"\s*(\d+(?:\.\d+)?(?:\s*/\s*\d+(?:\.\d+)?)?\s*(?:MG|MCG|GM|G|ML|IU|UNITS?|%|TABS?|CAPS?|PUFFS?|DROPS?)\b)",
+    re.IGNORECASE,
+)
+
+
+def tokenize_medication(line: str, profile: Profile = KIMS):
+    """Split one discharge drug line into form, drug, strength, schedule and duration.
+
+    "TAB.ELIQUIS 5MG 9AM-9PM X 1 WEEK" -> TAB / ELIQUIS (generic APIXABAN) /
+    5MG / 9AM-9PM / 1 WEEK. Drug names are looked up in the profile's
+    formulary trie, starting at the first word after the form; a name it
+    does not know there runs up to the first word with a digit and gets no
+    generic. Returns None if the line has no dosage form.
+    """
+    form = profile.medication_line.match(line)
+    if not form:
+        return None
+    rest = line[form.end():].lstrip(" .")
+
+    duration = DURATION.search(rest)
+    if duration:
+        rest = rest[:duration.start()] + rest[duration.end():]
+
+    # Only a name right after the form counts: one found later is in the schedule or instructions
+    spans = list(WORD.finditer(rest.upper()))
+    found = profile.formulary.match([span.group() for span in spans])
+    if found:
+        end, drug, generic = found
+        drug_end = spans[end - 1].end()
+    else:
+        generic = None
+        drug_end = next((span.start() for span in spans if DIGIT.search(span.group())), len(rest))
+        drug = SPACES.sub(" ", rest[:drug_end]).strip(" .-").upper() or None
+
+    strength = STRENGTH.match(rest, drug_end)
+    schedule = SPACES.sub(" ", rest[strength.end() if strength else drug_end:]).strip(" .-")
+    return {
+        "line": line,
+        "form": form.group(1).upper(),
+        "drug": drug,
+        "generic": generic,
+        "strength": SPACES.sub(" ", strength.group(1)).upper() if strength else None,
+        "schedule": schedule or None,
+        "duration": SPACES.sub(" ", (duration.group(1) or duration.group(2))).upper() if duration else None,
+    }
+
+
+@parser_metrics
+def medication_parse(text: str, profile: Profile = KIMS):
+    """{category heading: [tokenize_medication entry for each drug line under it]}."""
     clean_text = remove_header_text(text)
     medication = {}
 
-    section_pattern = (
-        r"(?:(?<=\n)|(?<=^))\s*"
-        r"(IMMUNOSUPPRESSANTS\s*:|"
-        r"RESPIRATORY\s+DRUGS\s*:|"
-        r"CARDIAC\s+DRUGS\s*:|"
-        r"ANTI\s+INFECTIVE\s+PROPHYLAXIS\s*:|"
-        r"GI\s+DRUGS\s*:|"
-        r"SUPPLEMENTS\s*:|"
-        r"OTHERS\s*:)"
-    )
-
-    parts = re.split(section_pattern, clean_text, flags=re.IGNORECASE)
+    parts = profile.medication_split.split(clean_text)
 
     current_category = None
     for part in parts:
@@ -162,12 +162,142 @@ def medication_parse(text:str):
         if not part:
             continue
 
-        if re.match(r"^[A-Z][A-Z\s]*:$", part):
+        if CATEGORY_HEADING.match(part):
             current_category = part.strip(":").upper()
             medication[current_category] = []
         elif current_category:
             for line in part.split("\n"):
-                line = line.strip()
-                if re.match(r"^(TAB|CAP|SYP|INJ|NEB|DROP|OINT|CREAM|SUPP)\b", line, re.IGNORECASE):
-                    medication[current_category].append(line)
+                entry = tokenize_medication(line.strip(), profile)
+                if entry is not None:
+                    medication[current_category].append(entry)
     return medication
+
+
+# Tests start at the profile's test_report_header ("<test name> - dd-mm-yyyy hh:mm" for KIMS),
+# matched on one line so a header never swallows the previous test's rows.
+TEST_REPORT_TIMESTAMP = re.compile(r"(\d{2}-\d{2}-\d{4})\s*(\d{2}:\d{2})$")
+
+
+def _parse_test_report(header: str, body: str, profile: Profile = KIMS):
+    header = header.strip()
+    timestamp = TEST_REPORT_TIMESTAMP.search(header)
+    return {
+        "header": header,
+        "date": timestamp.group(1) if timestamp else None,
+        "time": timestamp.group(2) if timestamp else None,
+        "rows": parse_parameter_rows(remove_garbage(body), profile.lab_skip_words),
+    }
+
+
+class TestReportStream:
+    """Page-fed lab test parser: feed() returns the tests a page completes.
+
+    Only the text of the test still in progress is kept (`pending`), so a
+    stream can be checkpointed after any page and resumed later from that
+    string, e.g. when a re-exported PDF only appends pages.
+    """
+
+    def __init__(self, pending: str = "", profile: Profile = KIMS):
+        self.pending = pending
+        self.profile = profile
+
+    def feed(self, page: str):
+        self.pending += page + "\n"
+        text = remove_garbage(self.pending)
+        headers = list(self.profile.test_report_header.finditer(text))
+        if len(headers) < 2:
+            return []
+        tests = [
+            _parse_test_report(header.group(1), text[header.end():next_header.start()], self.profile)
+            for header, next_header in zip(headers, headers[1:])
+        ]
+        # remove_garbage strips the page break after the pending text; put it back
+        self.pending = text[headers[-1].start():] + "\n"
+        return tests
+
+    def finish(self):
+        """Parse whatever is still pending; call once after the last page."""
+        text = remove_garbage(self.pending)
+        headers = list(self.profile.test_report_header.finditer(text))
+        tests = []
+        for i, header in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+            tests.append(_parse_test_report(header.group(1), text[header.end():end], self.profile))
+        return tests
+
+
+def iter_test_reports(pages, profile: Profile = KIMS):
+    """Yield one parsed lab test at a time from the IP Investigations text.
+
+    `pages` is any iterable of page texts (e.g. iter_section_pages(path,
+    "test_data")). A test is parsed as soon as the next test's header is
+    seen, and only the text of the test still in progress is kept, so memory
+    stays flat however many days of labs the stay has.
+    """
+    stream = TestReportStream(profile=profile)
+    for page in pages:
+        yield from stream.feed(page)
+    yield from stream.finish()
+
+
+@parser_metrics
+def test_reports_parse(txt: str, profile: Profile = KIMS):
+    """Parse the whole IP Investigations text into {test header: parameter rows}."""
+    tests = {}
+    for test in iter_test_reports([txt], profile):
+        tests[test["header"]] = test["rows"]
+    return tests
+
+
+@parser_metrics
+def test_reports_parse_pages(pages, profile: Profile = KIMS):
+    """test_reports_parse over the section's pages one at a time, without joining them first."""
+    tests = {}
+    for test in iter_test_reports(pages, profile):
+        tests[test["header"]] = test["rows"]
+    return tests
+
+
+PARAMETER_LINE = re.compile(r"^[A-Z][A-Z0-9\s\(\)\-\/\+%\.]+$")
+DIGIT = re.compile(r"\d")
+
+
+def parse_parameter_rows(body: str, skip_words=KIMS.lab_skip_words):
+    lines = [l.strip() for l in body.splitlines() if l.strip()]
+    data = []
+    current = {}
+    
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        low = line.lower()
+
+        # Skip known header or empty lines
+        if any(w in low for w in skip_words):
+            i += 1
+            continue
+
+        # Detect parameter (usually uppercase, contains spaces or parentheses)
+        if PARAMETER_LINE.match(line):
+            param = line
+            result = ""
+            normal = ""
+
+            # Try to take next one or two lines as result/range
+            if i + 1 < len(lines) and not PARAMETER_LINE.match(lines[i + 1]):
+                result = lines[i + 1]
+                i += 1
+
+            if i + 1 < len(lines) and DIGIT.search(lines[i + 1]):  # something numeric
+                normal = lines[i + 1]
+                i += 1
+
+            data.append({
+                "Parameter": param,
+                "Result": result.strip(),
+                "Normal Range": normal.strip()
+            })
+
+        i += 1
+
+    return data
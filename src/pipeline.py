@@ -0,0 +1,306 @@
+import re
+import threading
+from collections import Counter
+
+from src.cache import pdf_digest
+from src.document import Document
+from src.extractors import (
+    describe_source,
+    detect_pdf_profile,
+    extract_document,
+    extract_document_incremental,
+    iter_section_pages,
+    open_pdf,
+    read_ip_number,
+)
+from src.parsers import (
+    extract_patient_parse,
+    demographics_parse,
+    discharge_condition_parse,
+    medication_parse,
+    test_reports_parse,
+    test_reports_parse_pages,
+    iter_test_reports,
+    TestReportStream,
+)
+from src.profiles import get_profile
+from utils import metrics
+
+# Parsed section -> (parser, Document section it reads)
+SECTION_PARSERS = {
+    "patient": (extract_patient_parse, "patient_demographics"),
+    "diagnosis": (demographics_parse, "patient_demographics"),
+    "discharge": (discharge_condition_parse, "discharge_text"),
+    "medication": (medication_parse, "medication"),
+    "test_data": (test_reports_parse, "test_data"),
+}
+
+
+def _check_document(doc: Document, pdf_path):
+    if doc.error:
+        # Corrupt or not a PDF, as opposed to a readable PDF with no text layer
+        raise ValueError(f"Could not open {describe_source(pdf_path)}: {doc.error}")
+    # Every page lands in some section, so this is "any section has text" without joining them
+    if not any(page.strip() for page in doc.pages):
+        raise ValueError(f"No text extracted from {describe_source(pdf_path)}")
+
+
+def _cache_entry(doc: Document, parsed: dict):
+    # Joining every section at once is what low-memory mode avoids; with all
+    # sections parsed the cache never needs the text back anyway
+    sections = [] if doc.low_memory and SECTION_PARSERS.keys() <= parsed.keys() else list(doc.as_tuple())
+    return {"sections": sections, "profile": doc.profile, "parsed": parsed}
+
+
+def _cached_document(entry: dict):
+    return Document.from_sections(entry["sections"], entry.get("profile"))
+
+
+def _parse_sections(doc: Document, names=SECTION_PARSERS, on_section=None):
+    """Run the named section parsers over a Document with its template profile.
+
+    `on_section`, if given, is called as on_section(name, parsed) as each parser finishes.
+    """
+    profile = get_profile(doc.profile)
+    parsed = {}
+    for name in names:
+        parser, section = SECTION_PARSERS[name]
+        if parser is test_reports_parse and doc.low_memory:
+            parsed[name] = test_reports_parse_pages(doc.section_texts(section), profile)
+        else:
+            parsed[name] = parser(doc.text(section), profile)
+        if on_section is not None:
+            on_section(name, parsed[name])
+    return parsed
+
+
+def _admission_key(ip_no: str):
+    return "ip-" + re.sub(r"[^A-Za-z0-9_-]", "_", ip_no)
+
+
+def _resume_test_reports(doc: Document, page_hashes: list, previous: dict, profile):
+    """Stream the lab tests, restarting after the longest run of unchanged leading pages.
+
+    Returns the tests as [header, rows] pairs and, per test page, the stream's
+    (pending text, tests so far) checkpoint for the next version.
+    """
+    old_hashes = previous.get("section_hashes", {}).get("test_data", [])
+    old_checkpoints = previous.get("test_checkpoints", [])
+    common = 0
+    while common < min(len(old_hashes), len(page_hashes), len(old_checkpoints)) and old_hashes[common] == page_hashes[common]:
+        common += 1
+
+    if common:
+        pending, test_count = old_checkpoints[common - 1]
+        tests = previous["tests"][:test_count]
+        checkpoints = old_checkpoints[:common]
+    else:
+        pending, tests, checkpoints = "", [], []
+
+    stream = TestReportStream(pending, profile)
+    for index in doc.sections["test_data"][common:]:
+        tests.extend([test["header"], test["rows"]] for test in stream.feed(doc.pages[index]))
+        checkpoints.append([stream.pending, len(tests)])
+    final = tests + [[test["header"], test["rows"]] for test in stream.finish()]
+    return final, checkpoints
+
+
+def _parse_incremental(pdf_path, admissions, progress=None, on_section=None):
+    """Extract and parse a PDF, reusing the pages and sections of an earlier version of its IP No."""
+    with open_pdf(pdf_path) as fitz_doc:
+        ip_no = read_ip_number(fitz_doc)
+        previous = (admissions.get(_admission_key(ip_no)) if ip_no else None) or {}
+        # A digest seen on more than one page cannot say which page's text it stands for
+        seen = Counter(digest for digest, _, _ in previous.get("pages", []))
+        known_pages = {digest: (text, found) for digest, text, found in previous.get("pages", []) if seen[digest] == 1}
+        doc, records, boilerplate = extract_document_incremental(
+            fitz_doc, known_pages, boilerplate=previous.get("boilerplate", ()), progress=progress
+        )
+    _check_document(doc, pdf_path)
+    metrics.PAGES_REUSED.inc(sum(record[0] in known_pages for record in records))
+
+    hashes = [record[0] for record in records]
+    section_hashes = {
+        name: [hashes[i] for i in doc.sections[section]] for name, (_, section) in SECTION_PARSERS.items()
+    }
+    old_hashes = previous.get("section_hashes", {})
+    old_parsed = previous.get("parsed", {}) if previous.get("profile") == doc.profile else {}
+    profile = get_profile(doc.profile)
+
+    parsed = {}
+    for name, (parser, section) in SECTION_PARSERS.items():
+        if name == "test_data":
+            tests, checkpoints = _resume_test_reports(doc, section_hashes[name], previous, profile)
+            parsed[name] = {header: rows for header, rows in tests}
+        elif name in old_parsed and old_hashes.get(name) == section_hashes[name]:
+            parsed[name] = old_parsed[name]
+        else:
+            parsed[name] = parser(doc.text(section), profile)
+        if on_section is not None:
+            on_section(name, parsed[name])
+
+    if ip_no:
+        admissions.put(_admission_key(ip_no), {
+            "profile": doc.profile,
+            "pages": records,
+            "boilerplate": boilerplate,
+            "section_hashes": section_hashes,
+            "parsed": {name: value for name, value in parsed.items() if name != "test_data"},
+            "tests": tests,
+            "test_checkpoints": checkpoints,
+        })
+    return doc, parsed
+
+
+def parse_report(
+    pdf_path: str,
+    workers: int = 1,
+    cache=None,
+    admissions=None,
+    progress=None,
+    on_section=None,
+    limits=None,
+):
+    """Run the full extraction + parsing pipeline on one PDF and return every section.
+
+    With a ReportCache, a PDF already seen under the current code version is
+    answered from disk without opening it in fitz or running any parser.
+    With `admissions` (a ReportCache keyed by IP No), a new version of a known
+    admission only extracts its new or changed pages and re-runs the parsers
+    whose sections changed; lab tests resume after the unchanged pages.
+    `pdf_path` may be a file path or the PDF's bytes.
+    `progress(pages_done, page_count)` is called as pages are read and
+    `on_section(name, parsed)` as each section's parser finishes (or, from
+    the cache, for each stored section).
+    With `limits` (a utils.memory.MemoryLimits) the PDF is extracted in
+    low-memory mode (see extract_text_in_order) and the lab section is
+    parsed page by page instead of as one string. `admissions` is then not
+    used: its entries hold every page's text, which is what low-memory mode
+    exists to avoid keeping in memory.
+    """
+    digest = None
+    entry = None
+    if cache is not None:
+        digest = pdf_digest(pdf_path)
+        entry = cache.get(digest)
+        if entry is not None and SECTION_PARSERS.keys() <= entry["parsed"].keys():
+            if on_section is not None:
+                for name in SECTION_PARSERS:
+                    on_section(name, entry["parsed"][name])
+            return entry["parsed"]
+
+    if entry is not None:
+        # Partially parsed entry (e.g. from LazyReport): reuse its text, skip fitz
+        doc = _cached_document(entry)
+        parsed = _parse_sections(doc, on_section=on_section)
+    elif admissions is not None and limits is None:
+        doc, parsed = _parse_incremental(pdf_path, admissions, progress, on_section)
+    else:
+        doc = extract_document(pdf_path, workers=workers, progress=progress, limits=limits)
+        _check_document(doc, pdf_path)
+        parsed = _parse_sections(doc, on_section=on_section)
+
+    if cache is not None:
+        cache.put(digest, _cache_entry(doc, parsed))
+    doc.close()
+    return parsed
+
+
+def stream_test_reports(pdf_path: str):
+    """Yield the PDF's lab tests one at a time (see iter_test_reports) while its pages are read."""
+    profile = detect_pdf_profile(pdf_path)
+    yield from iter_test_reports(iter_section_pages(pdf_path, "test_data", profile), profile)
+
+
+def load_cached_report(digest: str, cache):
+    """Parsed report for a PDF hash from the ReportCache, parsing any section still missing."""
+    entry = cache.get(digest)
+    if entry is None:
+        return None
+    parsed = entry["parsed"]
+    missing = SECTION_PARSERS.keys() - parsed.keys()
+    if missing:
+        parsed.update(_parse_sections(_cached_document(entry), missing))
+        cache.put(digest, entry)
+    return parsed
+
+
+class LazyReport:
+    """A PDF extracted in a background thread, with each section parsed on first request.
+
+    start() returns immediately; section(name) waits for text extraction only,
+    then runs just that section's parser and memoizes the result.
+    """
+
+    def __init__(self, pdf_path: str, cache=None):
+        self.pdf_path = pdf_path
+        self.cache = cache
+        self.state = "pending"
+        self.error = None
+        self.pages_done = 0
+        self.pages_total = None
+        self._digest = None
+        self.document = None
+        self._parsed = {}
+        self._extracted = threading.Event()
+        self._locks = {name: threading.Lock() for name in SECTION_PARSERS}
+        self._save_lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._extract, name="report-extract", daemon=True).start()
+
+    def _on_page(self, pages_done, pages_total):
+        self.pages_done = pages_done
+        self.pages_total = pages_total
+
+    def _extract(self):
+        self.state = "extracting"
+        try:
+            entry = None
+            if self.cache is not None:
+                self._digest = pdf_digest(self.pdf_path)
+                entry = self.cache.get(self._digest)
+
+            if entry is not None:
+                self.document = _cached_document(entry)
+                self._parsed.update(entry["parsed"])
+            else:
+                doc = extract_document(self.pdf_path, progress=self._on_page)
+                _check_document(doc, self.pdf_path)
+                self.document = doc
+                self._save()
+            self.state = "ready"
+        except Exception as e:
+            print(f"[ERROR] Extraction failed for {describe_source(self.pdf_path)}: {e}")
+            self.error = str(e)
+            self.state = "failed"
+        finally:
+            self._extracted.set()
+
+    def _save(self):
+        if self.cache is None:
+            return
+        with self._save_lock:
+            self.cache.put(self._digest, _cache_entry(self.document, dict(self._parsed)))
+
+    def section(self, name: str, timeout: float | None = None):
+        """Parsed dict for one section, or None if extraction failed or timed out."""
+        if name in self._parsed:
+            return self._parsed[name]
+        if not self._extracted.wait(timeout) or self.document is None:
+            return None
+
+        with self._locks[name]:
+            if name not in self._parsed:
+                self._parsed.update(_parse_sections(self.document, [name]))
+                self._save()
+        return self._parsed[name]
+
+    def status(self):
+        return {
+            "state": self.state,
+            "pages_done": self.pages_done,
+            "pages_total": self.pages_total,
+            "parsed_sections": sorted(self._parsed),
+            "error": self.error,
+        }
@@ -0,0 +1,195 @@
+import glob
+import json
+import os
+import re
+
+from src.formulary import formulary_paths, load_formulary
+
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# Profile used when no template's detect pattern matches the first page
+DEFAULT_PROFILE = "kims"
+
+
+class SectionClassifier:
+    """Find every section marker on a page with one compiled scan."""
+
+    def __init__(self, markers: dict, flags=re.IGNORECASE):
+        self.markers = dict(markers)
+        alternatives = "|".join(f"(?P<{name}>{pattern})" for name, pattern in self.markers.items())
+        # Each marker sits in a lookahead so overlapping markers are all reported;
+        # the leading character class lets re skip straight to candidate offsets.
+        initials = _marker_initials(self.markers.values())
+        prefix = f"(?=[{re.escape(''.join(sorted(initials)))}])" if initials else ""
+        self.pattern = re.compile(f"{prefix}(?={alternatives})", flags)
+
+    def scan(self, text: str):
+        """Return (marker, offset) for every marker hit, in page order."""
+        return [(m.lastgroup, m.start()) for m in self.pattern.finditer(text)]
+
+
+def _marker_initials(patterns):
+    """First literal character of every marker alternative, or None if any is not literal."""
+    initials = set()
+    for pattern in patterns:
+        for alternative in pattern.split("|"):
+            head = alternative[:1]
+            if not head.isalnum():
+                return None
+            initials.add(head)
+    return initials
+
+
+class LabelScanner:
+    """Capture `Label : value` fields in a single pass over the text.
+
+    The scan stops only at colons: the words just before each colon are looked
+    up in the label table, and the matching field's value regex runs right
+    after the colon. `labels` maps field -> (label text, value regex with one
+    group), so adding a field adds a table entry rather than another pass.
+    `aliases` maps extra fields onto an existing one.
+
+    Lines starting with `line_trigger` are collected with `line_pattern` (a
+    MULTILINE regex with one group) using the same non-overlapping semantics
+    as findall. They get their own literal scan: mixing them into the colon
+    scan drops re off its fast literal search and costs more than it saves.
+    """
+
+    def __init__(self, labels: dict, aliases: dict | None = None, line_trigger: str | None = None,
+                 line_pattern: re.Pattern | None = None):
+        self.aliases = dict(aliases or {})
+        self.line_pattern = line_pattern
+        self.line_trigger = re.compile(rf"\n(?=\s*{line_trigger})", re.IGNORECASE) if line_trigger else None
+        self.fields = list(labels) + list(self.aliases)
+        self._labels = {}
+        for field, (label, value) in labels.items():
+            self._labels.setdefault(label.lower(), []).append((field, re.compile(r"\s*" + value, re.IGNORECASE)))
+        self._lengths = sorted({len(label) for label in self._labels}, reverse=True)
+
+    def scan(self, text: str):
+        """Return ({field: first value or None}, [line captures]) for `text`."""
+        values = {}
+        pos = text.find(":")
+        while pos != -1:
+            end = pos
+            while end and text[end - 1].isspace():
+                end -= 1
+            for length in self._lengths:
+                for field, value_re in self._labels.get(text[end - length:end].lower(), ()):
+                    if field not in values and (m := value_re.match(text, pos + 1)):
+                        values[field] = m.group(1).strip()
+            pos = text.find(":", pos + 1)
+
+        for alias, field in self.aliases.items():
+            values[alias] = values.get(field)
+        return {field: values.get(field) for field in self.fields}, self._scan_lines(text)
+
+    def _scan_lines(self, text: str):
+        if self.line_pattern is None:
+            return []
+        lines = []
+        line_end = 0
+        if m := self.line_pattern.match(text):
+            lines.append(m.group(1))
+            line_end = m.end()
+        if self.line_trigger is not None:
+            for hit in self.line_trigger.finditer(text):
+                start = hit.start() + 1
+                if start >= line_end and (m := self.line_pattern.match(text, start)):
+                    lines.append(m.group(1))
+                    line_end = m.end()
+        return lines
+
+
+class Profile:
+    """One hospital's report template, compiled once into the matchers the pipeline uses.
+
+    `spec` is the parsed JSON template (see templates/kims.json): the
+    markers that split pages into sections, the patient detail labels, the
+    history, discharge and medication headings, the drug formulary and the
+    lab test names. Every pattern is compiled here, so parsing a document
+    through a profile never compiles a regex per call.
+    """
+
+    def __init__(self, spec: dict, directory: str = TEMPLATES_DIR):
+        self.name = spec["name"]
+        self.hospital = spec.get("hospital", self.name)
+        self.detect_pattern = re.compile("|".join(spec["detect"]), re.IGNORECASE)
+
+        self.classifier = SectionClassifier(spec["section_markers"])
+
+        care_team = spec.get("care_team") or {}
+        self.patient_scanner = LabelScanner(
+            {field: tuple(label) for field, label in spec["patient_labels"].items()},
+            aliases=spec.get("patient_label_aliases"),
+            line_trigger=care_team.get("trigger"),
+            line_pattern=re.compile(care_team["pattern"], re.MULTILINE | re.IGNORECASE) if care_team else None,
+        )
+
+        self.history_fields = {
+            field: re.compile(pattern, re.IGNORECASE | re.DOTALL)
+            for field, pattern in spec["history_fields"].items()
+        }
+
+        discharge = spec["discharge"]
+        self.discharge_block = re.compile(discharge["block"], re.IGNORECASE | re.DOTALL)
+        self.discharge_summary_line = re.compile(discharge["summary_line"], re.IGNORECASE)
+        self.discharge_device_keyword = discharge["device_keyword"].lower()
+        self.discharge_vitals = re.compile(discharge["vitals"], re.IGNORECASE)
+        self.discharge_systems = {
+            system: re.compile(rf"{re.escape(system)}[:\s]*(.*?)(?:;|$)") for system in discharge["systems"]
+        }
+        self.discharge_labs = re.compile(discharge["lab_results"], re.IGNORECASE | re.DOTALL)
+
+        categories = "|".join(r"\s+".join(map(re.escape, name.split())) + r"\s*:" for name in spec["medication_categories"])
+        self.medication_split = re.compile(rf"(?:(?<=\n)|(?<=^))\s*({categories})", re.IGNORECASE)
+        forms = "|".join(map(re.escape, spec["medication_forms"]))
+        self.medication_line = re.compile(rf"^({forms})\b", re.IGNORECASE)
+        formulary = [os.path.join(directory, spec["formulary"])] if spec.get("formulary") else []
+        self.formulary_paths = formulary_paths(*formulary)
+
+        self.test_names = list(spec["test_names"])
+        self.test_name_pattern = re.compile(r"(?P<test>" + "|".join(self.test_names) + r")", re.IGNORECASE)
+        self.test_report_header = re.compile(spec["test_report_header"], re.IGNORECASE | re.MULTILINE)
+        self.lab_skip_words = tuple(spec["lab_skip_words"])
+
+    @property
+    def formulary(self):
+        """The template's formulary plus REPORT_FORMULARY, built into a trie on first use."""
+        return load_formulary(self.formulary_paths)
+
+    def matches(self, text: str):
+        """True if `text` (a document's first page) looks like this hospital's reports."""
+        return self.detect_pattern.search(text) is not None
+
+
+def load_profiles(directory: str = TEMPLATES_DIR):
+    """{name: Profile} for every *.json template in `directory`, in file name order."""
+    profiles = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            with open(path, encoding="utf-8") as file:
+                profile = Profile(json.load(file), directory)
+        except (OSError, ValueError, KeyError, re.error) as e:
+            print(f"[WARNING] Skipping template {path}: {e}")
+            continue
+        profiles[profile.name] = profile
+    return profiles
+
+
+PROFILES = load_profiles()
+KIMS = PROFILES[DEFAULT_PROFILE]
+
+
+def get_profile(name=None):
+    """The loaded profile called `name`, or the default profile."""
+    return PROFILES.get(name) or PROFILES[DEFAULT_PROFILE]
+
+
+def detect_profile(text: str):
+    """First profile whose detect pattern matches `text` (a document's first page), else the default."""
+    for profile in PROFILES.values():
+        if profile.matches(text):
+            return profile
+    return PROFILES[DEFAULT_PROFILE]
@@ -0,0 +1,45 @@
+import json
+import threading
+from collections import OrderedDict
+
+
+class ReportStore:
+    """Memory-capped LRU of parsed reports with a persistent fallback.
+
+    `loader(report_id)` is called on a miss, e.g. to reload a report evicted from
+    memory (or parsed before a restart) from the on-disk ReportCache.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, loader=None):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._reports = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, report_id: str, report: dict):
+        size = len(json.dumps(report, ensure_ascii=False))
+        with self._lock:
+            if report_id in self._reports:
+                self._bytes -= self._reports.pop(report_id)[1]
+            self._reports[report_id] = (report, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._reports) > 1:
+                _, (_, evicted_size) = self._reports.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get(self, report_id: str):
+        with self._lock:
+            if report_id in self._reports:
+                self._reports.move_to_end(report_id)
+                return self._reports[report_id][0]
+
+        if self.loader is None:
+            return None
+        report = self.loader(report_id)
+        if report is not None:
+            self.put(report_id, report)
+        return report
+
+    def __contains__(self, report_id: str):
+        return self.get(report_id) is not None
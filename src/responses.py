@@ -0,0 +1,92 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+# Bodies smaller than this are not worth a gzip variant
+GZIP_MIN_BYTES = 512
+
+
+class EncodedBody:
+    """A response body serialized once: the bytes, a gzip variant and strong ETags for both.
+
+    Endpoints keep these instead of dicts, so a request only compares ETags
+    and picks a variant; nothing is re-serialized or re-compressed.
+    """
+
+    __slots__ = ("body", "gzipped", "media_type", "etag", "gzip_etag")
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.etag = f'"{digest}"'
+        # A strong ETag names one exact representation, so the gzip bytes get their own
+        self.gzip_etag = f'"{digest}-gz"'
+        self.gzipped = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+
+    @classmethod
+    def json(cls, content):
+        """Encode like fastapi's JSONResponse, so the bytes on the wire do not change."""
+        body = json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"))
+        return cls(body.encode("utf-8"))
+
+    def __len__(self):
+        return len(self.body) + (len(self.gzipped) if self.gzipped else 0)
+
+    def not_modified(self, if_none_match: str | None):
+        """True if an If-None-Match header already names this body (either variant)."""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
+
+    def variant(self, accept_encoding: str | None):
+        """(body, ETag, Content-Encoding or None) for a request's Accept-Encoding header."""
+        if self.gzipped is not None and _accepts_gzip(accept_encoding):
+            return self.gzipped, self.gzip_etag, "gzip"
+        return self.body, self.etag, None
+
+
+def _accepts_gzip(accept_encoding: str | None):
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class ResponseCache:
+    """Memory-capped LRU of EncodedBody by key, e.g. (report ID, section)."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._bodies = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            encoded = self._bodies.get(key)
+            if encoded is not None:
+                self._bodies.move_to_end(key)
+            return encoded
+
+    def put(self, key, encoded: EncodedBody):
+        with self._lock:
+            if key in self._bodies:
+                self._bytes -= len(self._bodies.pop(key))
+            self._bodies[key] = encoded
+            self._bytes += len(encoded)
+            while self._bytes > self.max_bytes and len(self._bodies) > 1:
+                _, evicted = self._bodies.popitem(last=False)
+                self._bytes -= len(evicted)
+        return encoded
+
+    def discard(self, key):
+        with self._lock:
+            encoded = self._bodies.pop(key, None)
+            if encoded is not None:
+                self._bytes -= len(encoded)
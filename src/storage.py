@@ -1,8 +1,12 @@
-import pandas as pd
 import os
+import gzip
 import json
+import re
+import sqlite3
+from functools import lru_cache
 
 def save_to_csv(data: dict | list[dict],file_name: str,output_dir=r"D:\Nikhil\python\report_analysis\data\processed",overwrite: bool = True):
+    import pandas as pd  # deferred: pandas costs ~0.35s to import and only the CSV/JSON writers need it
 
     os.makedirs(output_dir, exist_ok=True)
     file_path = os.path.join(output_dir, file_name)
@@ -34,6 +38,8 @@ def save_to_json(
     output_dir=r"D:\Nikhil\python\report_analysis\data\processed",
     overwrite: bool = True
 ):
+    import pandas as pd
+
     os.makedirs(output_dir, exist_ok=True)
     file = os.path.join(output_dir, file_name)
 
@@ -49,3 +55,371 @@ def save_to_json(
         new_df = pd.concat([old, df], ignore_index=True)
         new_df.to_json(file, orient="records", indent=4, force_ascii=False)
         print(f"➕ Data appended → {file}")
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    umr_no TEXT PRIMARY KEY,
+    patient_name TEXT,
+    age_gender TEXT,
+    mobile_no TEXT,
+    address TEXT
+);
+CREATE TABLE IF NOT EXISTS admissions (
+    ip_no TEXT PRIMARY KEY,
+    umr_no TEXT,
+    admission_date TEXT,
+    discharge_date TEXT,
+    doctor_name TEXT,
+    prime_consultant TEXT,
+    ward_room_bed TEXT,
+    care_team TEXT,
+    treatment TEXT,
+    chief_complaints TEXT,
+    present_history TEXT,
+    past_history TEXT,
+    discharge_condition TEXT,
+    source_file TEXT
+);
+CREATE TABLE IF NOT EXISTS diagnoses (
+    ip_no TEXT NOT NULL,
+    line_no INTEGER NOT NULL,
+    diagnosis TEXT
+);
+CREATE TABLE IF NOT EXISTS medications (
+    ip_no TEXT NOT NULL,
+    category TEXT,
+    line_no INTEGER NOT NULL,
+    medication TEXT,
+    form TEXT,
+    drug TEXT,
+    generic TEXT,
+    strength TEXT,
+    schedule TEXT,
+    duration TEXT
+);
+CREATE TABLE IF NOT EXISTS lab_results (
+    ip_no TEXT NOT NULL,
+    test_header TEXT,
+    collected_at TEXT,
+    parameter TEXT,
+    result TEXT,
+    normal_range TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_admissions_umr_no ON admissions (umr_no);
+CREATE INDEX IF NOT EXISTS idx_admissions_admission_date ON admissions (admission_date);
+CREATE INDEX IF NOT EXISTS idx_diagnoses_ip_no ON diagnoses (ip_no);
+CREATE INDEX IF NOT EXISTS idx_medications_ip_no ON medications (ip_no);
+CREATE INDEX IF NOT EXISTS idx_lab_results_ip_no ON lab_results (ip_no, parameter);
+"""
+
+# Fields of each tokenize_medication entry stored beside the raw line
+MEDICATION_FIELDS = ("form", "drug", "generic", "strength", "schedule", "duration")
+
+# Columns added to tables after their first release: table -> [(column, type)]
+ADDED_COLUMNS = {
+    "medications": [(name, "TEXT") for name in MEDICATION_FIELDS],
+}
+
+DATE_TIME = re.compile(r"(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})(?:\s+(\d{1,2}):(\d{2}))?")
+
+
+@lru_cache(maxsize=4096)
+def _iso_date(value):
+    """'02-09-2025 06:44' -> '2025-09-02 06:44' so dates sort and index correctly; None if unparseable."""
+    match = DATE_TIME.search(value or "")
+    if not match:
+        return None
+    day, month, year, hour, minute = match.groups()
+    iso = f"{year}-{int(month):02d}-{int(day):02d}"
+    return f"{iso} {int(hour):02d}:{minute}" if hour else iso
+
+
+def connect_sqlite(db_path: str = os.path.join("data", "processed", "reports.db")):
+    """Open (and if needed create) the report database in WAL mode."""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SQLITE_SCHEMA)
+    _add_missing_columns(conn)
+    return conn
+
+
+def _add_missing_columns(conn):
+    """Bring a database created by an older version up to ADDED_COLUMNS."""
+    for table, columns in ADDED_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, kind in columns:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+
+
+def save_reports_to_sqlite(reports: list[dict], db_path: str = os.path.join("data", "processed", "reports.db")):
+    """Write parsed reports (parse_report output, optionally with 'source_file') in one transaction.
+
+    Rows are keyed by IP No; re-saving an admission replaces its rows.
+    """
+    patients, admissions, diagnoses, medications, labs = [], [], [], [], []
+    for report in reports:
+        patient = report.get("patient") or {}
+        ip_no = patient.get("IP No")
+        if not ip_no:
+            print(f"⚠️ Skipping report without IP No: {report.get('source_file')}")
+            continue
+        umr_no = patient.get("UMR No")
+        diagnosis = report.get("diagnosis") or {}
+
+        if umr_no:
+            patients.append((umr_no, patient.get("Patient Name"), patient.get("Age/Gender"),
+                             patient.get("Mobile No"), patient.get("Address")))
+        admissions.append((
+            ip_no, umr_no,
+            _iso_date(patient.get("Admission Date")), _iso_date(patient.get("Discharge Date")),
+            patient.get("Doctor Name"), patient.get("Prime Consultant"), patient.get("Ward/Room/Bed"),
+            json.dumps(patient.get("Care Team") or [], ensure_ascii=False),
+            diagnosis.get("Treatment"), diagnosis.get("Chief Complaints"),
+            diagnosis.get("Present History"), diagnosis.get("Past History"),
+            json.dumps(report.get("discharge") or {}, ensure_ascii=False),
+            report.get("source_file"),
+        ))
+        for line_no, line in enumerate((diagnosis.get("Diagnosis") or "").splitlines()):
+            diagnoses.append((ip_no, line_no, line))
+        for category, entries in (report.get("medication") or {}).items():
+            for line_no, entry in enumerate(entries):
+                medications.append((ip_no, category, line_no, entry["line"], *(entry[f] for f in MEDICATION_FIELDS)))
+        for header, rows in (report.get("test_data") or {}).items():
+            collected_at = _iso_date(header)
+            for row in rows:
+                labs.append((ip_no, header, collected_at, row.get("Parameter"), row.get("Result"), row.get("Normal Range")))
+
+    ip_nos = [(row[0],) for row in admissions]
+    conn = connect_sqlite(db_path)
+    try:
+        with conn:
+            for table in ("diagnoses", "medications", "lab_results"):
+                conn.executemany(f"DELETE FROM {table} WHERE ip_no = ?", ip_nos)
+            conn.executemany("INSERT OR REPLACE INTO patients VALUES (?, ?, ?, ?, ?)", patients)
+            conn.executemany(
+                "INSERT OR REPLACE INTO admissions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", admissions
+            )
+            conn.executemany("INSERT INTO diagnoses VALUES (?, ?, ?)", diagnoses)
+            conn.executemany(
+                "INSERT INTO medications (ip_no, category, line_no, medication, form, drug, generic, strength, schedule, duration)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                medications,
+            )
+            conn.executemany("INSERT INTO lab_results VALUES (?, ?, ?, ?, ?, ?)", labs)
+    finally:
+        conn.close()
+    print(f"🗄️ {len(admissions)} reports saved → {db_path}")
+
+
+class JsonArrayWriter:
+    """Buffered writer of a JSON array file (records indented like save_to_json's output).
+
+    Appending to an existing array cuts off its closing bracket and carries
+    on after a comma, so a batch costs O(batch) instead of a re-read and
+    rewrite of the whole file; the bracket is written back by close().
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, append: bool = True):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.buffer = []
+        if append and os.path.exists(path) and os.path.getsize(path):
+            self.file = open(path, "r+b")
+            self.empty = self._reopen_array()
+        else:
+            self.file = open(path, "wb")
+            self.file.write(b"[")
+            self.empty = True
+
+    def _reopen_array(self):
+        """Truncate the file at its closing bracket; True if the array has no records yet."""
+        end = self.file.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(position - 4096, 0)
+            self.file.seek(start)
+            chunk = self.file.read(position - start)
+            bracket = chunk.rfind(b"]")
+            if bracket != -1:
+                cut = start + bracket
+                self.file.seek(max(cut - 4096, 0))
+                before = self.file.read(cut - max(cut - 4096, 0))
+                cut -= len(before) - len(before.rstrip())
+                self.file.truncate(cut)
+                self.file.seek(cut)
+                return before.rstrip().endswith(b"[")
+            position = start
+        raise ValueError(f"{self.path} is not a JSON array")
+
+    def write(self, record: dict):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for record in self.buffer:
+            self.file.write(b"\n" if self.empty else b",\n")
+            self.file.write(json.dumps(record, ensure_ascii=False, indent=4).encode("utf-8"))
+            self.empty = False
+        self.buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.write(b"\n]\n")
+        self.file.close()
+
+
+class JsonlWriter:
+    """Buffered newline-delimited JSON writer: open once, write(record) many times.
+
+    Records are encoded compactly and written every `batch_size` records, so an
+    append costs O(record) rather than a rewrite of the file. Paths ending in
+    .gz are gzip-compressed (appending adds a new gzip member, which readers
+    handle transparently).
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, append: bool = True):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        mode = "at" if append else "wt"
+        if path.endswith(".gz"):
+            self.file = gzip.open(path, mode, encoding="utf-8")
+        else:
+            self.file = open(path, mode, encoding="utf-8")
+        self.path = path
+        self.batch_size = batch_size
+        self.count = 0
+        self._buffer = []
+
+    def write(self, record: dict):
+        self._buffer.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.file.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Fixed Parquet column layout per section; rows come from section_rows()
+PARQUET_SCHEMAS = {
+    "patient": {
+        "source_file": "string", "Patient Name": "string", "Age/Gender": "string", "IP No": "string",
+        "UMR No": "string", "Admission Date": "string", "Discharge Date": "string", "Doctor Name": "string",
+        "Ward/Room/Bed": "string", "Mobile No": "string", "Address": "string", "Prime Consultant": "string",
+        "Care Team": "list<string>",
+    },
+    "diagnosis": {
+        "source_file": "string", "Diagnosis": "string", "Treatment": "string", "Chief Complaints": "string",
+        "Present History": "string", "Past History": "string",
+    },
+    "discharge": {
+        "source_file": "string", "condition_summary": "string", "devices": "list<string>", "vitals": "string",
+        "systems": "string", "lab_results": "string",
+    },
+    "medication": {
+        "source_file": "string", "category": "string", "medication": "string", "form": "string", "drug": "string",
+        "generic": "string", "strength": "string", "schedule": "string", "duration": "string",
+    },
+    "test_data": {
+        "source_file": "string", "test_header": "string", "Parameter": "string", "Result": "string",
+        "Normal Range": "string",
+    },
+}
+
+
+def section_rows(section: str, data, source_file: str | None = None):
+    """Flatten one parsed section into rows matching PARQUET_SCHEMAS[section]."""
+    if section == "medication":
+        for category, entries in (data or {}).items():
+            for entry in entries:
+                yield {
+                    "source_file": source_file,
+                    "category": category,
+                    "medication": entry["line"],
+                    **{field: entry[field] for field in MEDICATION_FIELDS},
+                }
+    elif section == "test_data":
+        for header, rows in (data or {}).items():
+            for row in rows:
+                yield {"source_file": source_file, "test_header": header, **row}
+    else:
+        yield {"source_file": source_file, **(data or {})}
+
+
+class ParquetWriter:
+    """Buffered Parquet writer for one section with a fixed schema; needs pyarrow.
+
+    Each flush writes one row group. Parquet files cannot be appended to, so
+    the file is replaced when the writer is opened.
+    """
+
+    def __init__(self, path: str, section: str, batch_size: int = 10000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("ParquetWriter needs pyarrow: pip install pyarrow") from e
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        types = {"string": pa.string(), "list<string>": pa.list_(pa.string())}
+        self._columns = PARQUET_SCHEMAS[section]
+        self.schema = pa.schema([(name, types[kind]) for name, kind in self._columns.items()])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        self._pa = pa
+        self.path = path
+        self.batch_size = batch_size
+        self.count = 0
+        self._buffer = {name: [] for name in self._columns}
+
+    def write(self, row: dict):
+        for name, kind in self._columns.items():
+            value = row.get(name)
+            if value is not None and kind == "string" and not isinstance(value, str):
+                value = json.dumps(value, ensure_ascii=False)
+            self._buffer[name].append(value)
+        self.count += 1
+        if len(self._buffer["source_file"]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer["source_file"]:
+            table = self._pa.Table.from_pydict(self._buffer, schema=self.schema)
+            self.writer.write_table(table)
+            self._buffer = {name: [] for name in self._columns}
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,5 +1,9 @@
 import re
 
+from utils.metrics import ERRORS, timed
+
+
+@timed("clean_page_text")
 def clean_page_text(text: str):
     try:
         text = re.sub(
@@ -32,8 +36,75 @@ def clean_page_text(text: str):
         return text.strip()
     except Exception as e:
         print(f"Error in clean_page_text: {str(e)}")
+        ERRORS.inc(stage="clean_page_text")
         return text
 
+
+SPACES = re.compile(r"[ \t]+")
+
+
+def join_blocks(blocks):
+    """Text of (y, text) blocks, one line per line, whitespace normalized like clean_page_text."""
+    lines = (SPACES.sub(" ", line).strip() for _, text in blocks for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+class BoilerplateStripper:
+    """Drop the header/footer blocks a document repeats on most of its pages.
+
+    Pages are lists of (y, text) text blocks, top to bottom. The first and
+    last `zone` blocks of each page are counted once per page, hashed with
+    their rounded y position; a block printed at the same place on at least
+    `min_ratio` of the pages (and on `min_pages` or more) is boilerplate.
+    strip() removes the boilerplate run at the top and bottom of a page, so
+    body text that merely recurs (a lab range ending most pages) stays.
+    Nothing is hospital-specific and each page is handled in linear time.
+    """
+
+    def __init__(self, zone: int = 3, min_ratio: float = 0.5, min_pages: int = 3, known=()):
+        self.zone = zone
+        self.min_ratio = min_ratio
+        self.min_pages = min_pages
+        self.pages_seen = 0
+        self._counts = {}
+        self._known = {hash((round(y), text)) for y, text in known}
+
+    def observe(self, blocks):
+        """Count one page's header/footer candidate blocks."""
+        for key in {hash((round(y), text)) for y, text in blocks[:self.zone] + blocks[-self.zone:]}:
+            self._counts[key] = self._counts.get(key, 0) + 1
+        self.pages_seen += 1
+
+    def ready(self):
+        """True once enough pages were observed to tell boilerplate from content."""
+        return self.pages_seen >= self.min_pages or bool(self._known)
+
+    def _bounds(self, blocks):
+        threshold = max(self.min_pages, self.min_ratio * self.pages_seen)
+
+        def is_boilerplate(block):
+            key = hash((round(block[0]), block[1]))
+            return key in self._known or self._counts.get(key, 0) >= threshold
+
+        start, stop = 0, len(blocks)
+        while start < stop and start < self.zone and is_boilerplate(blocks[start]):
+            start += 1
+        while stop > start and len(blocks) - stop < self.zone and is_boilerplate(blocks[stop - 1]):
+            stop -= 1
+        return start, stop
+
+    def boilerplate(self, blocks):
+        """(y, text) blocks strip() would drop from a page, e.g. to seed a later stripper with `known`."""
+        start, stop = self._bounds(blocks)
+        return [(round(y), text) for y, text in blocks[:start] + blocks[stop:]]
+
+    def strip(self, blocks):
+        """Text of a page without its leading/trailing boilerplate blocks."""
+        start, stop = self._bounds(blocks)
+        return join_blocks(blocks[start:stop])
+
+
+@timed("remove_header_text")
 def remove_header_text(text: str):
     try:
         text = text.replace("\xa0", " ")
@@ -62,8 +133,10 @@ def remove_header_text(text: str):
         return '\n'.join(cleaned_lines)
     except Exception as e:
         print(f"Error in remove_header_text: {str(e)}")
+        ERRORS.inc(stage="remove_header_text")
         return text
 
+@timed("remove_garbage")
 def remove_garbage(text: str) -> str:
     
     try:
@@ -76,6 +149,7 @@ def remove_garbage(text: str) -> str:
         return text.strip()
     except Exception as e:
         print(f"Error in remove_garbage: {str(e)}")
+        ERRORS.inc(stage="remove_garbage")
         return text
 
 # def clean_page_text(text):
@@ -0,0 +1,65 @@
+import gc
+import os
+
+
+MB = 1024 * 1024
+
+
+class MemoryLimitExceeded(MemoryError):
+    """A worker's resident memory stayed above its ceiling after freeing what it could."""
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if it cannot be read here."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class MemoryLimits:
+    """Settings for low-memory extraction.
+
+    Pages are read one at a time and MuPDF's caches dropped after each;
+    cleaned page text beyond `spill_bytes` goes to a temporary file; and
+    check() raises MemoryLimitExceeded once RSS passes `max_rss_bytes`
+    (no ceiling if None), so a runaway PDF fails on its own instead of
+    getting the whole worker OOM-killed.
+    """
+
+    def __init__(self, spill_bytes: int = 16 * MB, max_rss_bytes: int | None = None):
+        self.spill_bytes = spill_bytes
+        self.max_rss_bytes = max_rss_bytes
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        """Limits from REPORT_LOW_MEMORY=1, REPORT_SPILL_MB and REPORT_MAX_RSS_MB, or None if not enabled."""
+        if environ.get("REPORT_LOW_MEMORY", "").lower() not in ("1", "true", "yes"):
+            return None
+        max_rss = environ.get("REPORT_MAX_RSS_MB")
+        return cls(
+            spill_bytes=int(float(environ.get("REPORT_SPILL_MB", 16)) * MB),
+            max_rss_bytes=int(float(max_rss) * MB) if max_rss else None,
+        )
+
+    def check(self, where: str, release=None):
+        """Raise MemoryLimitExceeded if RSS is over the ceiling even after release() and a GC pass."""
+        if self.max_rss_bytes is None:
+            return
+        rss = current_rss()
+        if rss is None or rss <= self.max_rss_bytes:
+            return
+        if release is not None:
+            release()
+        gc.collect()
+        rss = current_rss()
+        if rss > self.max_rss_bytes:
+            raise MemoryLimitExceeded(
+                f"RSS {rss / MB:.0f} MB over the {self.max_rss_bytes / MB:.0f} MB ceiling at {where}"
+            )
@@ -0,0 +1,209 @@
+import threading
+import time
+from functools import wraps
+
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return {key: value for key, value in self._values.items()}
+
+    def merge(self, samples: dict):
+        with self._lock:
+            for key, value in samples.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+    def render(self):
+        for key, value in sorted(self.samples().items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics) with optional labels.
+
+    observe() only bumps one bucket count, the sum and the count; the
+    cumulative totals are computed when the metrics are rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the wall time of its block."""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            return {key: [list(counts), total, count] for key, (counts, total, count) in self._values.items()}
+
+    def merge(self, samples: dict):
+        with self._lock:
+            for key, (counts, total, count) in samples.items():
+                entry = self._values.get(key)
+                if entry is None:
+                    entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+
+    def render(self):
+        for key, (counts, total, count) in sorted(self.samples().items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else _number(bound)
+                yield f"{self.name}_bucket{_labels((*self.labelnames, 'le'), (*key, le))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = []
+
+STAGE_SECONDS = Histogram("report_stage_seconds", "Time spent per pipeline stage call.", ["stage"])
+PARSER_SECONDS = Histogram("report_parser_seconds", "Time spent per section parser call.", ["parser"])
+PAGES = Counter("report_pages_total", "PDF pages read.")
+PAGES_REUSED = Counter("report_pages_reused_total", "Pages reused unchanged from an earlier version of the admission.")
+PDF_BYTES = Counter("report_pdf_bytes_total", "Bytes of PDF input opened.")
+TEXT_BYTES = Counter("report_text_chars_total", "Characters of cleaned page text extracted.")
+PARSER_MISSES = Counter("report_parser_misses_total", "Parsed fields returned as None.", ["parser", "field"])
+ERRORS = Counter("report_errors_total", "Failures caught and logged by a pipeline stage.", ["stage"])
+
+
+def timed(stage: str):
+    """Decorator recording each call's duration in report_stage_seconds{stage=...}."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        return wrapper
+    return decorator
+
+
+def parser_metrics(func):
+    """Decorator timing a section parser and counting the None fields in the dict it returns."""
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        PARSER_SECONDS.observe(time.perf_counter() - started, parser=name)
+        if isinstance(result, dict):
+            for field, value in result.items():
+                if value is None:
+                    PARSER_MISSES.inc(parser=name, field=field)
+        return result
+    return wrapper
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def export():
+    """Samples recorded so far in this process, for merge() in another one."""
+    return {metric.name: metric.samples() for metric in REGISTRY}
+
+
+def merge(samples: dict):
+    """Add samples exported by a worker process into this process's metrics."""
+    for metric in REGISTRY:
+        if metric.name in samples:
+            metric.merge(samples[metric.name])
+
+
+def reset():
+    for metric in REGISTRY:
+        with metric._lock:
+            metric._values.clear()
+
+
+def call_collecting(func, *args, **kwargs):
+    """Run func in a worker process and return (result, metrics it recorded) for merge()."""
+    reset()
+    result = func(*args, **kwargs)
+    return result, export()